@@ -0,0 +1,58 @@
+import datetime
+import decimal
+
+from django import forms
+from django.utils.translation import ugettext_lazy as _
+
+from benchmarks.models import Country
+
+COUNTRY_COUNT = 250
+STATIC_CHOICE_COUNT = 10000
+DATE_FIELD_COUNT = 30
+
+
+class LoginForm(forms.Form):
+    username = forms.CharField(label=_('Username'), max_length=30)
+    password = forms.CharField(label=_('Password'), widget=forms.PasswordInput)
+    remember_me = forms.BooleanField(label=_('Remember me'), required=False)
+
+
+# Fields of the mixed form, repeated until it has 100 fields
+MIXED_FIELDS = [
+    lambda: forms.CharField(label=_('Name'), max_length=100, help_text=_('Your full name')),
+    lambda: forms.EmailField(label=_('Email')),
+    lambda: forms.IntegerField(min_value=0, max_value=150, required=False),
+    lambda: forms.DecimalField(max_digits=8, decimal_places=2, initial=decimal.Decimal('9.99')),
+    lambda: forms.DateField(initial=datetime.date(2012, 6, 1)),
+    lambda: forms.DateTimeField(required=False),
+    lambda: forms.BooleanField(required=False),
+    lambda: forms.ChoiceField(choices=[(x, _('Option')) for x in range(10)]),
+    lambda: forms.MultipleChoiceField(choices=[(x, 'Option %d' % x) for x in range(10)], widget=forms.CheckboxSelectMultiple),
+    lambda: forms.CharField(widget=forms.Textarea, required=False),
+]
+
+MixedForm = type('MixedForm', (forms.Form,), dict(
+    ('field_%d' % index, MIXED_FIELDS[index % len(MIXED_FIELDS)]()) for index in range(100)
+))
+
+
+class StaticChoicesForm(forms.Form):
+    choice = forms.ChoiceField(choices=[(x, 'Choice %d' % x) for x in range(STATIC_CHOICE_COUNT)])
+    choices = forms.MultipleChoiceField(choices=[(x, 'Choice %d' % x) for x in range(STATIC_CHOICE_COUNT)])
+
+
+DateForm = type('DateForm', (forms.Form,), dict(
+    ('date_%d' % index, forms.DateField(required=False)) for index in range(DATE_FIELD_COUNT)
+))
+
+
+class ModelChoicesForm(forms.Form):
+    country = forms.ModelChoiceField(queryset=Country.objects.all())
+    visited = forms.ModelMultipleChoiceField(queryset=Country.objects.all(), required=False)
+    citizenship = forms.ModelChoiceField(queryset=Country.objects.filter(code__startswith='A'), required=False)
+
+
+def create_countries():
+    Country.objects.bulk_create([
+        Country(name='Country %03d' % index, code=chr(65 + index % 26) * 2) for index in range(COUNTRY_COUNT)
+    ])
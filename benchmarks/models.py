@@ -0,0 +1,12 @@
+from django.db import models
+
+
+class Country(models.Model):
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=2)
+
+    class Meta:
+        ordering = ('name',)
+
+    def __unicode__(self):
+        return self.name
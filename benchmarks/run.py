@@ -0,0 +1,246 @@
+"""
+Benchmarks of RemoteForm serialization, run offline against an in-memory
+SQLite database:
+
+    python -m benchmarks.run --output after.json --compare before.json
+
+Every case reports per call:
+
+* time: the best average time of several rounds, in seconds.
+* allocations: the number of memory blocks allocated by the call and still
+  alive at its end, output included, measured with tracemalloc when
+  available. Otherwise, e.g. on Python 2, the number of objects tracked by
+  the garbage collector created by the call and still alive at its end.
+* peak_memory: the peak of memory allocated by the call in bytes, measured
+  with tracemalloc when available. Otherwise, the growth of the peak
+  resident set size of a forked process running the call, at page
+  granularity and including pages copied on write, where fork() and the
+  resource module are available.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+from django.core.management import call_command
+
+from django_remote_forms.forms import RemoteForm
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Minimum duration of a timing round, in seconds
+MIN_ROUND_TIME = 0.2
+ROUNDS = 5
+
+
+def get_cases():
+    """
+    Returns (name, function) pairs of the benchmarks. Forms are built up
+    front so that only their serialization is measured.
+    """
+    from benchmarks import forms
+
+    login_form = forms.LoginForm()
+    mixed_form = forms.MixedForm()
+    bound_mixed_form = forms.MixedForm({'field_0': 'x', 'field_2': 'not a number'})
+    static_choices_form = forms.StaticChoicesForm()
+    date_form = forms.DateForm()
+    model_choices_form = forms.ModelChoicesForm()
+
+    return [
+        ('login', lambda: RemoteForm(login_form).as_dict()),
+        ('login_cached', lambda: RemoteForm(login_form, cache=True).as_dict()),
+        ('mixed_100', lambda: RemoteForm(mixed_form).as_dict()),
+        ('mixed_100_cached', lambda: RemoteForm(mixed_form, cache=True).as_dict()),
+        ('mixed_100_bound', lambda: RemoteForm(bound_mixed_form).as_dict()),
+        ('mixed_100_json', lambda: RemoteForm(mixed_form).as_json()),
+        ('mixed_100_cached_json', lambda: RemoteForm(mixed_form, cache=True).as_json()),
+        ('static_choices_10k', lambda: RemoteForm(static_choices_form).as_dict()),
+        ('static_choices_10k_table', lambda: RemoteForm(static_choices_form, choice_table=True).as_dict()),
+        ('dates_30', lambda: RemoteForm(date_form).as_dict()),
+        ('model_choices', lambda: RemoteForm(model_choices_form).as_dict()),
+        ('model_choices_paginated', lambda: RemoteForm(model_choices_form, choices_page_size=50).as_dict()),
+    ]
+
+
+def measure_time(func):
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= MIN_ROUND_TIME:
+            break
+        number *= 2
+
+    rounds = [elapsed] + timeit.repeat(func, number=number, repeat=ROUNDS - 1)
+    return min(rounds) / number, number
+
+
+def measure_memory(func):
+    gc.collect()
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            start_size = tracemalloc.get_traced_memory()[0]
+            result = func()
+            after = tracemalloc.take_snapshot()
+            peak_memory = tracemalloc.get_traced_memory()[1] - start_size
+        finally:
+            tracemalloc.stop()
+
+        allocations = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+        del result
+        return allocations, peak_memory
+
+    gc.disable()
+    try:
+        before = gc.get_count()[0]
+        result = func()
+        allocations = gc.get_count()[0] - before
+    finally:
+        gc.enable()
+
+    del result
+    return allocations, measure_peak_rss(func)
+
+
+def measure_peak_rss(func):
+    """
+    Returns the growth of the peak resident set size of a child process, in
+    bytes, while it runs func. Children start with the resident set size of
+    the parent at fork() as their peak, rather than the parent's own peak.
+    """
+    if resource is None or not hasattr(os, 'fork'):
+        return None
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            func()
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            os.write(write_fd, str(after - before).encode('ascii'))
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(write_fd)
+    try:
+        output = os.read(read_fd, 64)
+    finally:
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+
+    if not output:
+        return None
+
+    # ru_maxrss is in kilobytes, except on OS X
+    return int(output) * (1 if sys.platform == 'darwin' else 1024)
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.STDOUT
+        ).strip().decode('ascii')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def setup_database():
+    from benchmarks.forms import create_countries
+
+    call_command('syncdb', interactive=False, verbosity=0)
+    create_countries()
+
+
+def run(names=None):
+    results = {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'cases': {},
+    }
+
+    for name, func in get_cases():
+        if names and name not in names:
+            continue
+
+        # Warm up memoized lookups, e.g. of serializers and plans
+        func()
+
+        call_time, number = measure_time(func)
+        allocations, peak_memory = measure_memory(func)
+
+        results['cases'][name] = {
+            'time': call_time,
+            'calls': number * ROUNDS,
+            'allocations': allocations,
+            'peak_memory': peak_memory,
+        }
+        print('%-28s %10.3f ms %10s allocations %12s bytes peak' % (
+            name, call_time * 1000, allocations, peak_memory if peak_memory is not None else '-'
+        ))
+
+    return results
+
+
+def compare(results, baseline):
+    print('\nCompared to %s:' % (baseline.get('commit') or 'baseline'))
+
+    for name, case in sorted(results['cases'].items()):
+        baseline_case = baseline['cases'].get(name)
+        if baseline_case is None:
+            print('%-28s new case' % name)
+            continue
+
+        print('%-28s %+7.1f%% time %+10d allocations' % (
+            name,
+            (case['time'] / baseline_case['time'] - 1) * 100,
+            case['allocations'] - baseline_case['allocations']
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks RemoteForm serialization.')
+    parser.add_argument('cases', nargs='*', help='names of the cases to run, all by default')
+    parser.add_argument('--output', help='file to write the results to as JSON')
+    parser.add_argument('--compare', help='results file of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    setup_database()
+    results = run(args.cases)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(results, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
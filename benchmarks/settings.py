@@ -0,0 +1,28 @@
+# Settings for running the benchmarks offline, see benchmarks/run.py, and the
+# tests, see benchmarks/tests.py
+
+import os
+import tempfile
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        # Threads prefetching choices in the tests need a database they can share
+        'TEST_NAME': os.path.join(tempfile.gettempdir(), 'django_remote_forms_tests.db'),
+    }
+}
+
+INSTALLED_APPS = (
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'benchmarks',
+)
+
+USE_I18N = True
+USE_L10N = False
+LANGUAGE_CODE = 'en-us'
+
+SECRET_KEY = 'django-remote-forms-benchmarks'
@@ -0,0 +1,650 @@
+"""
+Tests of django_remote_forms against the benchmark forms, run with:
+
+    django-admin.py test benchmarks --settings=benchmarks.settings
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import django
+
+from django import forms
+from django.core import validators
+from django.core.exceptions import ValidationError
+from django.forms.formsets import formset_factory
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase
+from django.test.client import RequestFactory
+from django.utils import unittest
+
+from benchmarks import forms as benchmark_forms
+from benchmarks.models import Country
+from django_remote_forms import backends, choices, logger
+from django_remote_forms.cache import choice_cache
+from django_remote_forms.choices import shares_transaction
+from django_remote_forms.compact import expand_form_dict
+from django_remote_forms.fields import RemoteCharField
+from django_remote_forms.forms import RemoteForm
+from django_remote_forms.formsets import RemoteFormSet
+from django_remote_forms.instrumentation import MemoryCollector
+from django_remote_forms.precompile import precompile_forms
+from django_remote_forms.registry import field_serializers
+from django_remote_forms.validation import compile_validator
+from django_remote_forms.views import (
+    choices_response, field_validation_response, precompiled_form_response, remote_form_response
+)
+
+
+class ComboForm(forms.Form):
+    name = forms.CharField()
+    combo = forms.ComboField(fields=[forms.CharField(max_length=20), forms.EmailField()])
+
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class OrderedCharField(forms.CharField):
+    pass
+
+
+class RemoteOrderedCharField(RemoteCharField):
+    __slots__ = ()
+
+    def serialize(self, field, name, initial, context):
+        return OrderedDict(sorted(super(RemoteOrderedCharField, self).serialize(field, name, initial, context).items()))
+
+
+class OrderedForm(forms.Form):
+    name = OrderedCharField(max_length=30)
+
+
+class FieldSelectionTestCase(TestCase):
+    def test_exclude(self):
+        form_dict = RemoteForm(benchmark_forms.LoginForm(), exclude=['remember_me']).as_dict()
+
+        self.assertEqual(form_dict['ordered_fields'], ['username', 'password'])
+        self.assertEqual(form_dict['fields'].keys(), ['username', 'password'])
+
+    def test_include(self):
+        form_dict = RemoteForm(benchmark_forms.LoginForm(), include=['password']).as_dict()
+
+        self.assertEqual(form_dict['ordered_fields'], ['password'])
+
+    def test_include_and_exclude_in_common(self):
+        form_dict = RemoteForm(benchmark_forms.LoginForm(), include=['password'], exclude=['password']).as_dict()
+
+        self.assertEqual(form_dict['ordered_fields'], ['username', 'password', 'remember_me'])
+
+    def test_formset_exclude(self):
+        formset = formset_factory(benchmark_forms.LoginForm, can_delete=True)()
+        formset_dict = RemoteFormSet(formset, exclude=['DELETE']).as_dict()
+
+        self.assertEqual(formset_dict['form']['ordered_fields'], ['username', 'password', 'remember_me'])
+
+
+class PrefetchTestCase(TestCase):
+    def setUp(self):
+        benchmark_forms.create_countries()
+
+    def test_shares_transaction(self):
+        self.assertTrue(shares_transaction('default'))
+
+    def test_prefetch_inside_transaction(self):
+        form = benchmark_forms.ModelChoicesForm()
+
+        self.assertEqual(
+            RemoteForm(form, prefetch_choices=2).as_dict(),
+            RemoteForm(form).as_dict()
+        )
+
+
+class ThreadedPrefetchTestCase(TransactionTestCase):
+    def setUp(self):
+        benchmark_forms.create_countries()
+
+        self.threads = []
+        build_choice_page = choices.build_choice_page
+
+        def record_build_choice_page(*args):
+            self.threads.append(threading.current_thread())
+            return build_choice_page(*args)
+
+        choices.build_choice_page = record_build_choice_page
+        self.addCleanup(setattr, choices, 'build_choice_page', build_choice_page)
+
+    def test_shares_transaction(self):
+        self.assertFalse(shares_transaction('default'))
+
+    def test_prefetch(self):
+        for kwargs in ({}, {'choices_page_size': 10}):
+            form = benchmark_forms.ModelChoicesForm()
+            form_dict = RemoteForm(form, prefetch_choices=2, **kwargs).as_dict()
+
+            self.assertEqual(len(self.threads), 3)
+            self.assertFalse(threading.current_thread() in self.threads)
+
+            self.threads = []
+            self.assertEqual(form_dict, RemoteForm(form, **kwargs).as_dict())
+            self.threads = []
+
+
+class PaginationTestCase(TestCase):
+    def setUp(self):
+        benchmark_forms.create_countries()
+
+    def get_all_choices(self, field, page_size=7, search=None, search_fields=None):
+        all_choices = []
+        cursor = None
+
+        while True:
+            choice_page = choices.paginate_choices(
+                field, page_size, cursor=cursor, search=search, search_fields=search_fields
+            )
+            self.assertTrue(len(choice_page.choices) <= page_size + 1)
+            all_choices.extend(choice_page.choices)
+            cursor = choice_page.cursor
+            if cursor is None:
+                return all_choices
+
+    def assertPaginated(self, queryset, ordered_queryset=None):
+        field = forms.ModelChoiceField(queryset=queryset)
+        ordered_field = forms.ModelChoiceField(queryset=ordered_queryset or queryset)
+
+        self.assertEqual(self.get_all_choices(field), list(ordered_field.choices))
+
+    def test_ascending(self):
+        self.assertPaginated(Country.objects.all())
+
+    def test_descending(self):
+        self.assertPaginated(Country.objects.order_by('-name'))
+
+    def test_ties(self):
+        # Rows equal on every ordering field are ordered by primary key
+        self.assertPaginated(Country.objects.order_by('code'), Country.objects.order_by('code', 'pk'))
+        self.assertPaginated(Country.objects.order_by('-code'), Country.objects.order_by('-code', '-pk'))
+
+    def test_secondary_ordering(self):
+        self.assertPaginated(Country.objects.order_by('code', '-name'))
+        self.assertPaginated(Country.objects.order_by('-code', 'name'))
+
+    def test_primary_key_ordering(self):
+        self.assertPaginated(Country.objects.order_by('-pk'))
+        self.assertPaginated(Country.objects.order_by('code', '-id', 'name'))
+
+    def test_ordering(self):
+        self.assertEqual(choices.get_ordering(Country.objects.all()), [('name', False), ('pk', False)])
+        self.assertEqual(
+            choices.get_ordering(Country.objects.order_by('-code', 'name')),
+            [('code', True), ('name', False), ('pk', False)]
+        )
+        self.assertEqual(choices.get_ordering(Country.objects.order_by('code', '?')), [('code', False), ('pk', False)])
+        self.assertEqual(choices.get_ordering(Country.objects.order_by('-id', 'name')), [('pk', True)])
+
+    def test_search(self):
+        field = forms.ModelChoiceField(queryset=Country.objects.order_by('code', '-name'))
+        search_choices = self.get_all_choices(field, search='country 1', search_fields=['name'])
+
+        self.assertEqual(len(search_choices), 100)
+        self.assertEqual(
+            search_choices,
+            [choice for choice in field.choices if choice[0] and 'Country 1' in choice[1]]
+        )
+
+        search_choices = self.get_all_choices(field, search='bb')
+
+        pks = set(Country.objects.filter(code='BB').values_list('pk', flat=True))
+        self.assertEqual(len(search_choices), len(pks))
+        self.assertEqual(search_choices, [choice for choice in field.choices if choice[0] in pks])
+
+    def test_search_requires_search_fields(self):
+        field = forms.ModelChoiceField(queryset=Country.objects.order_by('pk'))
+
+        self.assertRaises(ValueError, choices.paginate_choices, field, 10, search='country')
+
+    def test_decode_cursor(self):
+        ordering = [('name', False), ('pk', False)]
+        cursor = choices.encode_cursor(['Country 001', 2])
+
+        self.assertEqual(choices.decode_cursor(cursor, ordering), ['Country 001', 2])
+        self.assertRaises(ValueError, choices.decode_cursor, cursor, [('pk', False)])
+        self.assertRaises(ValueError, choices.decode_cursor, 'bad', ordering)
+        self.assertRaises(ValueError, choices.decode_cursor, choices.encode_cursor({'pk': 2}), ordering)
+
+    def test_choices_response(self):
+        form = benchmark_forms.ModelChoicesForm()
+
+        response = choices_response(RequestFactory().get('/'), form, 'country', page_size=10)
+        response_data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response_data['choices']), 11)
+        self.assertEqual(response_data['choices'][0], {'value': '', 'display': form.fields['country'].empty_label})
+
+        response = choices_response(
+            RequestFactory().get('/', {'cursor': response_data['cursor']}), form, 'country', page_size=10
+        )
+        next_response_data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [choice['display'] for choice in next_response_data['choices']],
+            ['Country %03d' % index for index in range(10, 20)]
+        )
+
+    def test_choices_response_bad_cursor(self):
+        form = benchmark_forms.ModelChoicesForm()
+
+        for cursor in ('bad', choices.encode_cursor([1])):
+            response = choices_response(RequestFactory().get('/', {'cursor': cursor}), form, 'country')
+
+            self.assertEqual(response.status_code, 400)
+
+
+class SignupForm(forms.Form):
+    username = forms.CharField(max_length=10)
+    email = forms.EmailField()
+    password = forms.CharField()
+    password_again = forms.CharField()
+
+    def clean_username(self):
+        if self.cleaned_data['username'] == 'admin':
+            raise ValidationError('Username taken')
+        return self.cleaned_data['username'].upper()
+
+    def clean(self):
+        if self.cleaned_data.get('password') != self.cleaned_data.get('password_again'):
+            raise ValidationError('Passwords differ')
+        return self.cleaned_data
+
+
+class FieldValidationTestCase(TestCase):
+    def get_form(self, data, prefix='signup'):
+        return SignupForm(dict(('%s-%s' % (prefix, name), value) for name, value in data.items()), prefix=prefix)
+
+    def test_valid_fields(self):
+        form = self.get_form({'username': 'alice', 'email': 'invalid'})
+        form_dict = RemoteForm(form).validate_fields(['username'])
+
+        self.assertEqual(form_dict, {'is_valid': True, 'errors': {}, 'non_field_errors': []})
+        self.assertEqual(form.cleaned_data, {'username': 'ALICE'})
+
+    def test_invalid_fields(self):
+        form = self.get_form({'username': 'admin', 'email': 'invalid', 'password': 'secret'})
+        form_dict = RemoteForm(form).validate_fields(['username', 'email', 'password'])
+
+        self.assertFalse(form_dict['is_valid'])
+        self.assertEqual(form_dict['errors']['username'], ['Username taken'])
+        self.assertEqual(sorted(form_dict['errors'].keys()), ['email', 'username'])
+        self.assertEqual(form.cleaned_data, {'password': 'secret'})
+
+    def test_prefix(self):
+        form = self.get_form({'email': 'alice@example.com'}, prefix='other')
+
+        self.assertTrue(RemoteForm(form).validate_fields(['email'])['is_valid'])
+
+        # Unprefixed data isn't read by a prefixed form
+        form = SignupForm({'email': 'alice@example.com'}, prefix='signup')
+
+        self.assertEqual(RemoteForm(form).validate_fields(['email'])['errors'].keys(), ['email'])
+
+    def test_clean_form(self):
+        form = self.get_form({'password': 'secret', 'password_again': 'other'})
+
+        self.assertTrue(RemoteForm(form).validate_fields(['password', 'password_again'])['is_valid'])
+
+        form_dict = RemoteForm(form).validate_fields(['password', 'password_again'], clean_form=True)
+
+        self.assertFalse(form_dict['is_valid'])
+        self.assertEqual(form_dict['errors'].keys(), ['__all__'])
+        self.assertEqual(form_dict['non_field_errors'], ['Passwords differ'])
+
+    def test_unbound_form(self):
+        form_dict = RemoteForm(SignupForm()).validate_fields(['username'])
+
+        self.assertEqual(form_dict, {'is_valid': False, 'errors': {}, 'non_field_errors': []})
+
+    def test_unknown_fields(self):
+        form = self.get_form({'username': 'alice', 'email': 'invalid'})
+
+        self.assertRaises(ValueError, RemoteForm(form).validate_fields, ['username', 'missing'])
+        self.assertRaises(ValueError, RemoteForm(form, exclude=['email']).validate_fields, ['email'])
+
+    def test_field_validation_response(self):
+        remote_form = RemoteForm(self.get_form({'username': 'admin', 'email': 'invalid'}), exclude=['password'])
+        request_factory = RequestFactory()
+
+        response = field_validation_response(request_factory.post('/?field=username&field=email'), remote_form)
+        response_data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertFalse(response_data['is_valid'])
+        self.assertEqual(sorted(response_data['errors'].keys()), ['email', 'username'])
+
+        for query_string in ('', '?field=missing', '?field=password'):
+            response = field_validation_response(request_factory.post('/' + query_string), remote_form)
+
+            self.assertEqual(response.status_code, 400)
+
+
+class SplitEmailValidator(validators.EmailValidator):
+    # The attributes of EmailValidator since Django 1.6
+    user_regex = re.compile(r"^[-!#$%&'*+/=?^_`{}|~0-9A-Z]+(\.[-!#$%&'*+/=?^_`{}|~0-9A-Z]+)*\Z", re.IGNORECASE)
+    domain_regex = re.compile(
+        r'(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)\Z', re.IGNORECASE
+    )
+    domain_whitelist = ['localhost']
+
+    def __init__(self):
+        super(SplitEmailValidator, self).__init__(message='Enter a valid email address.', code='invalid')
+
+
+class ValidationRulesTestCase(TestCase):
+    def get_rules(self, field):
+        form = type('RulesForm', (forms.Form,), {'value': field})()
+        return RemoteForm(form, validation_rules=True).as_dict()['fields']['value']['validators']
+
+    @unittest.skipIf(django.VERSION[:2] >= (1, 6), 'EmailValidator is a RegexValidator before Django 1.6 only')
+    def test_regex_email_validator(self):
+        rule = compile_validator(validators.validate_email)
+
+        self.assertEqual(rule['type'], 'regex')
+
+    @unittest.skipIf(django.VERSION[:2] < (1, 6), 'EmailValidator is split since Django 1.6')
+    def test_email_validator(self):
+        rule = compile_validator(validators.validate_email)
+
+        self.assertEqual(rule['type'], 'email')
+        self.assertEqual(rule['domain_whitelist'], ['localhost'])
+        self.assertTrue(re.search(rule['domain_pattern'], 'example.com', re.IGNORECASE))
+        self.assertFalse(re.search(rule['domain_pattern'], '!!!example.com', re.IGNORECASE))
+
+    def test_split_email_validator(self):
+        rule = compile_validator(SplitEmailValidator())
+
+        self.assertEqual(rule['type'], 'email')
+        self.assertEqual(rule['user_pattern'], r"^(?:^[-!#$%&'*+/=?^_`{}|~0-9A-Z]+(\.[-!#$%&'*+/=?^_`{}|~0-9A-Z]+)*$)")
+        self.assertEqual(rule['user_flags'], 'i')
+        self.assertTrue(rule['domain_pattern'].startswith('^(?:'))
+        self.assertEqual(rule['domain_flags'], 'i')
+        self.assertEqual(rule['literal_pattern'], None)
+        self.assertEqual(rule['domain_whitelist'], ['localhost'])
+        self.assertEqual(rule['message'], 'Enter a valid email address.')
+
+    def test_length_messages(self):
+        rules = self.get_rules(forms.CharField(min_length=2, max_length=5))
+
+        self.assertEqual([rule['message'] for rule in rules], [
+            'Ensure this value has at least 2 characters (it has %(show_value)s).',
+            'Ensure this value has at most 5 characters (it has %(show_value)s).',
+        ])
+
+    def test_field_length_message(self):
+        rules = self.get_rules(forms.CharField(max_length=5, error_messages={
+            'max_length': 'At most %(limit_value)d, not %(show_value)d'
+        }))
+
+        self.assertEqual(rules[0]['message'], 'At most 5, not %(show_value)s')
+
+    def test_decimal_messages(self):
+        rules = self.get_rules(forms.DecimalField(max_digits=5, decimal_places=2))
+
+        self.assertEqual(rules[-1]['messages'], {
+            'max_digits': 'Ensure that there are no more than 5 digits in total.',
+            'max_decimal_places': 'Ensure that there are no more than 2 decimal places.',
+            'max_whole_digits': 'Ensure that there are no more than 3 digits before the decimal point.',
+        })
+
+
+class ChoiceCacheTestCase(TestCase):
+    def setUp(self):
+        choice_cache.register(Country)
+
+    def enable_choice_cache(self):
+        choice_cache.alias = 'default'
+        choice_cache._cache = None
+        self.addCleanup(setattr, choice_cache, 'alias', None)
+        self.addCleanup(setattr, choice_cache, '_cache', None)
+
+    def get_country_choices(self):
+        form_dict = RemoteForm(benchmark_forms.ModelChoicesForm()).as_dict()
+        return [choice['display'] for choice in form_dict['fields']['country']['choices']]
+
+    def test_save_disabled(self):
+        self.assertFalse(choice_cache.enabled)
+
+        country = Country.objects.create(name='Country', code='CC')
+        country.delete()
+
+    def test_invalidate(self):
+        self.enable_choice_cache()
+        version = choice_cache.get_version(Country)
+        self.assertEqual(self.get_country_choices(), [u'---------'])
+
+        Country.objects.create(name='Country', code='CC')
+        self.assertNotEqual(choice_cache.get_version(Country), version)
+        self.assertEqual(self.get_country_choices(), [u'---------', u'Country'])
+
+    def test_invalidate_after_update(self):
+        self.enable_choice_cache()
+        Country.objects.create(name='Country', code='CC')
+        self.assertEqual(self.get_country_choices(), [u'---------', u'Country'])
+
+        Country.objects.update(name='Renamed')
+        self.assertEqual(self.get_country_choices(), [u'---------', u'Country'])
+
+        choice_cache.invalidate(Country)
+        self.assertEqual(self.get_country_choices(), [u'---------', u'Renamed'])
+
+
+class SubclassedCharField(forms.CharField):
+    pass
+
+
+class SubclassedTextInput(forms.TextInput):
+    pass
+
+
+class SubclassedFieldsForm(forms.Form):
+    name = SubclassedCharField()
+    email = forms.EmailField(widget=SubclassedTextInput)
+
+
+class InstrumentationTestCase(TestCase):
+    def get_fallbacks(self, form):
+        collector = MemoryCollector()
+        RemoteForm(form, collector=collector).as_dict()
+        return collector.stats.values()[0]['fallbacks']
+
+    def test_fallbacks(self):
+        self.assertEqual(self.get_fallbacks(SubclassedFieldsForm()), {
+            ('name', 'SubclassedCharField'): 1,
+            ('email', 'SubclassedTextInput'): 1,
+        })
+
+    def test_no_fallbacks(self):
+        self.assertEqual(self.get_fallbacks(benchmark_forms.LoginForm()), {})
+
+
+class PrecompiledFormTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_response(self):
+        manifest = precompile_forms(self.directory, [('login', 'benchmarks.forms.LoginForm', {})], ['en-us'])
+        filename = manifest['login']['en-us']['json']
+
+        response = precompiled_form_response(RequestFactory().get('/'), 'login', directory=self.directory)
+
+        with open(os.path.join(self.directory, filename), 'rb') as precompiled_file:
+            content = precompiled_file.read()
+        self.assertEqual(''.join(response), content)
+        self.assertEqual(response['Content-Length'], str(len(content)))
+        if django.VERSION[:2] >= (1, 5):
+            self.assertTrue(response.streaming)
+
+    def test_unknown_form(self):
+        precompile_forms(self.directory, [('login', 'benchmarks.forms.LoginForm', {})], ['en-us'])
+
+        self.assertRaises(
+            Http404, precompiled_form_response, RequestFactory().get('/'), 'signup', directory=self.directory
+        )
+
+    def test_missing_manifest(self):
+        self.assertRaises(
+            Http404, precompiled_form_response, RequestFactory().get('/'), 'login', directory=self.directory
+        )
+
+
+class FingerprintTestCase(TestCase):
+    def test_combo_field(self):
+        fingerprint = RemoteForm(ComboForm()).fingerprint()
+
+        self.assertEqual(len(fingerprint), 40)
+        self.assertEqual(fingerprint, RemoteForm(ComboForm(), cache=True).fingerprint())
+
+    def test_combo_field_subfields_change_fingerprint(self):
+        form = ComboForm()
+        fingerprint = RemoteForm(form).fingerprint()
+
+        form = ComboForm()
+        # Sub-fields are shared with the form class, replace rather than modify them
+        form.fields['combo'].fields = [forms.CharField(max_length=30), forms.EmailField()]
+        self.assertNotEqual(fingerprint, RemoteForm(form).fingerprint())
+
+    def test_combo_field_etag(self):
+        request_factory = RequestFactory()
+
+        response = remote_form_response(request_factory.get('/'), RemoteForm(ComboForm(), cache=True))
+        self.assertEqual(response.status_code, 200)
+
+        response = remote_form_response(
+            request_factory.get('/', HTTP_IF_NONE_MATCH=response['ETag']),
+            RemoteForm(ComboForm(), cache=True)
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class JSONTestCase(TestCase):
+    def test_iter_json_combo_field(self):
+        form = ComboForm()
+
+        self.assertEqual(json.loads(''.join(RemoteForm(form).iter_json())), json.loads(RemoteForm(form).as_json()))
+
+    def test_formset_iter_json_combo_field(self):
+        formset = formset_factory(ComboForm)()
+        formset_dict = json.loads(''.join(RemoteFormSet(formset).iter_json()))
+
+        self.assertEqual(formset_dict['form']['fields'].keys(), ['name', 'combo'])
+
+
+class DeltaTestCase(TestCase):
+    def test_combo_field(self):
+        form = ComboForm({'name': 'name', 'combo': 'invalid'})
+        form_dict = RemoteForm(form, cache=True).as_delta()
+
+        self.assertEqual(form_dict['fingerprint'], RemoteForm(ComboForm(), cache=True).fingerprint())
+        self.assertEqual(form_dict['data'], {'name': 'name', 'combo': 'invalid'})
+        self.assertTrue('combo' in form_dict['errors'])
+
+    def test_uncached_warning(self):
+        warnings = []
+        handler = logging.Handler()
+        handler.emit = warnings.append
+        logger.addHandler(handler)
+
+        try:
+            RemoteForm(ComboForm(), cache=True).as_delta()
+            self.assertEqual(warnings, [])
+
+            RemoteForm(ComboForm()).as_delta()
+            self.assertEqual(len(warnings), 1)
+        finally:
+            logger.removeHandler(handler)
+
+
+class FormSetTestCase(TestCase):
+    def test_management_form_data(self):
+        ComboFormSet = formset_factory(ComboForm)
+        formset = ComboFormSet({
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '0',
+            'form-MAX_NUM_FORMS': '',
+            'form-0-name': 'name',
+            'form-0-combo': 'name@example.com',
+        })
+        formset_dict = RemoteFormSet(formset).as_dict()
+
+        self.assertEqual(formset_dict['management_form']['data'], {
+            'TOTAL_FORMS': '1',
+            'INITIAL_FORMS': '0',
+            'MAX_NUM_FORMS': '',
+        })
+        self.assertEqual(formset_dict['forms'][0]['data'], {'name': 'name', 'combo': 'name@example.com'})
+
+
+class CompactTestCase(TestCase):
+    def setUp(self):
+        benchmark_forms.create_countries()
+
+    def test_round_trip(self):
+        for form in (
+            benchmark_forms.LoginForm(),
+            benchmark_forms.MixedForm(),
+            benchmark_forms.MixedForm({'field_0': 'x', 'field_2': 'not a number'}),
+            benchmark_forms.StaticChoicesForm(),
+            benchmark_forms.DateForm(),
+            benchmark_forms.ModelChoicesForm(),
+        ):
+            for kwargs in ({}, {'choices_page_size': 50}):
+                remote_form_dict = RemoteForm(form, compact=True, **kwargs).as_dict()
+                self.assertEqual(expand_form_dict(remote_form_dict), RemoteForm(form, **kwargs).as_dict())
+
+    def test_round_trip_ordered_field_dict(self):
+        field_serializers.register(OrderedCharField, RemoteOrderedCharField)
+
+        try:
+            remote_form_dict = RemoteForm(OrderedForm(), compact=True).as_dict()
+            self.assertEqual(expand_form_dict(remote_form_dict), RemoteForm(OrderedForm()).as_dict())
+        finally:
+            field_serializers.unregister(OrderedCharField)
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class MessagePackTestCase(TestCase):
+    def setUp(self):
+        benchmark_forms.create_countries()
+
+    def assertDecodesToJSON(self):
+        for form in (
+            benchmark_forms.LoginForm(),
+            benchmark_forms.MixedForm({'field_0': 'x', 'field_2': 'not a number'}),
+            benchmark_forms.DateForm(),
+            benchmark_forms.ModelChoicesForm(),
+            ComboForm(),
+        ):
+            for kwargs in ({}, {'cache': True}):
+                packed = RemoteForm(form, **kwargs).encode(backends.MessagePackBackend())
+                self.assertEqual(msgpack.unpackb(packed, raw=False), json.loads(RemoteForm(form, **kwargs).as_json()))
+
+    def test_msgpack(self):
+        self.assertDecodesToJSON()
+
+    def test_fallback(self):
+        backend_msgpack = backends.msgpack
+        backends.msgpack = None
+
+        try:
+            self.assertDecodesToJSON()
+        finally:
+            backends.msgpack = backend_msgpack
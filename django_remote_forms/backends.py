@@ -0,0 +1,246 @@
+import datetime
+import decimal
+import struct
+
+from django import forms
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.encoding import force_unicode
+from django.utils.functional import Promise
+
+# Importing fields registers the field and widget serializers
+from django_remote_forms import fields
+from django_remote_forms.registry import field_serializers
+from django_remote_forms.utils import get_callable_name
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+
+# Marks the chunk of a map value to be filled in per request, see Backend.split_map
+SLOT = object()
+
+
+def encode_default(o):
+    """
+    Returns an encodable equivalent of the values serializers leave as is:
+    lazy translations, dates, times and decimals, formatted like
+    DjangoJSONEncoder does, form fields, e.g. the 'fields' of ComboFields,
+    serialized by their registered serializer, and callables, by name.
+    """
+    if isinstance(o, Promise):
+        return force_unicode(o)
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time, decimal.Decimal)):
+        return DjangoJSONEncoder().default(o)
+    if isinstance(o, forms.Field):
+        remote_field = field_serializers.get_serializer(o.__class__)
+        if remote_field is not None:
+            return remote_field.serialize(o, None, None, {})
+    elif callable(o):
+        return get_callable_name(o)
+
+    raise TypeError('%r is not serializable' % o)
+
+
+class RemoteJSONEncoder(DjangoJSONEncoder):
+    """
+    A DjangoJSONEncoder which also encodes lazy translations, form fields and
+    callables, see encode_default.
+    """
+
+    def default(self, o):
+        return encode_default(o)
+
+
+class Backend(object):
+    """
+    Encodes serialized forms to bytes, see RemoteForm.iter_encoded.
+
+    Subclasses encode single values with encode() and maps of values already
+    encoded with iter_map(). name tells apart the output of backends in
+    cached templates and ETags.
+    """
+
+    name = None
+    content_type = None
+
+    @property
+    def template_key(self):
+        # Tells apart the templates of cached schemas encoded differently
+        return self.__class__
+
+    def encode(self, value):
+        raise NotImplementedError
+
+    def iter_map(self, items):
+        """
+        Yields the chunks of a map from (key, chunks of the encoded value)
+        pairs. The chunks of a value must be consumed before the next pair is
+        requested.
+        """
+        raise NotImplementedError
+
+    def split_map(self, items, slot_key):
+        """
+        Returns the encoded map of items as the chunks before and after the
+        value of slot_key, so that the map can be encoded again by only
+        encoding that value.
+        """
+        chunks = list(self.iter_map(
+            (key, [SLOT] if key == slot_key else [self.encode(value)]) for key, value in items
+        ))
+
+        for index, chunk in enumerate(chunks):
+            if chunk is SLOT:
+                return ''.join(chunks[:index]), ''.join(chunks[index + 1:])
+
+        raise KeyError(slot_key)
+
+
+class JSONBackend(Backend):
+    name = 'json'
+    content_type = 'application/json'
+
+    def __init__(self, encoder_class=RemoteJSONEncoder):
+        self.encoder = encoder_class()
+
+        # simplejson's speedups are faster than the json module of Python 2,
+        # and give the same output for the default encoder
+        self.use_simplejson = simplejson is not None and encoder_class is RemoteJSONEncoder
+
+    @property
+    def template_key(self):
+        return self.__class__, self.encoder.__class__
+
+    def encode(self, value):
+        if self.use_simplejson:
+            # Decimals are encoded as strings like DjangoJSONEncoder does
+            return simplejson.dumps(value, default=encode_default, use_decimal=False)
+
+        return self.encoder.encode(value)
+
+    def iter_map(self, items):
+        yield '{'
+        for index, (key, chunks) in enumerate(items):
+            yield '%s%s: ' % (', ' if index else '', self.encoder.encode(key))
+            for chunk in chunks:
+                yield chunk
+        yield '}'
+
+
+def pack_map_header(size):
+    if size < 16:
+        return chr(0x80 | size)
+    if size < 0x10000:
+        return struct.pack('>BH', 0xde, size)
+
+    return struct.pack('>BI', 0xdf, size)
+
+
+def pack_array_header(size):
+    if size < 16:
+        return chr(0x90 | size)
+    if size < 0x10000:
+        return struct.pack('>BH', 0xdc, size)
+
+    return struct.pack('>BI', 0xdd, size)
+
+
+def pack_text(text):
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+
+    size = len(text)
+    if size < 32:
+        return chr(0xa0 | size) + text
+    if size < 0x10000:
+        return struct.pack('>BH', 0xda, size) + text
+
+    return struct.pack('>BI', 0xdb, size) + text
+
+
+def pack_int(value):
+    if 0 <= value < 0x80:
+        return chr(value)
+    if -0x20 <= value < 0:
+        return struct.pack('>b', value)
+    if value >= 0:
+        if value < 0x100:
+            return struct.pack('>BB', 0xcc, value)
+        if value < 0x10000:
+            return struct.pack('>BH', 0xcd, value)
+        if value < 0x100000000:
+            return struct.pack('>BI', 0xce, value)
+        if value < 0x10000000000000000:
+            return struct.pack('>BQ', 0xcf, value)
+    else:
+        if value >= -0x80:
+            return struct.pack('>Bb', 0xd0, value)
+        if value >= -0x8000:
+            return struct.pack('>Bh', 0xd1, value)
+        if value >= -0x80000000:
+            return struct.pack('>Bi', 0xd2, value)
+        if value >= -0x8000000000000000:
+            return struct.pack('>Bq', 0xd3, value)
+
+    raise ValueError('Integer %r is too large for MessagePack' % value)
+
+
+def packb(value):
+    """
+    Encodes value to MessagePack, using the original str types for text
+    like msgpack.packb(value, use_bin_type=False) does.
+    """
+    if value is None:
+        return '\xc0'
+    if value is True:
+        return '\xc3'
+    if value is False:
+        return '\xc2'
+    if isinstance(value, (int, long)):
+        return pack_int(value)
+    if isinstance(value, float):
+        return struct.pack('>Bd', 0xcb, value)
+    if isinstance(value, basestring):
+        return pack_text(value)
+    if isinstance(value, (list, tuple)):
+        return pack_array_header(len(value)) + ''.join(packb(x) for x in value)
+    if isinstance(value, dict):
+        return pack_map_header(len(value)) + ''.join(packb(k) + packb(v) for k, v in value.items())
+
+    return packb(encode_default(value))
+
+
+class MessagePackBackend(Backend):
+    """
+    Encodes forms to MessagePack, with the msgpack package when installed or
+    a pure Python encoder otherwise.
+    """
+
+    name = 'msgpack'
+    content_type = 'application/x-msgpack'
+
+    def encode(self, value):
+        if msgpack is not None:
+            return msgpack.packb(value, default=encode_default, use_bin_type=False)
+
+        return packb(value)
+
+    def iter_map(self, items):
+        # The size of a map comes first, so the map is only sent once complete
+        size = 0
+        chunks = []
+        for key, value_chunks in items:
+            size += 1
+            chunks.append(self.encode(key))
+            chunks.extend(value_chunks)
+
+        yield pack_map_header(size)
+        for chunk in chunks:
+            yield chunk
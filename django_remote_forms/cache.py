@@ -0,0 +1,346 @@
+import cPickle
+import hashlib
+import pickle
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.db.models import signals
+from django.db.models.sql import EmptyResultSet
+from django.utils.translation import get_language
+
+from django_remote_forms import __version__, logger
+from django_remote_forms.utils import resolve_value
+
+DEFAULT_SCHEMA_CACHE_SIZE = 512
+
+# Seconds a worker building a schema holds the lock of its key, and others
+# wait for the schema before building it themselves
+DEFAULT_SCHEMA_LOCK_TIMEOUT = 10
+SCHEMA_LOCK_POLL_INTERVAL = 0.05
+
+
+class SchemaCache(object):
+    """
+    A process wide store for the static part of serialized forms.
+
+    Entries are keyed by form class, the serialization options passed to
+    RemoteForm and the active language, so that field and widget metadata is
+    only built and translated once for every combination actually in use.
+    The least recently used entries are evicted beyond max_size entries,
+    which defaults to the REMOTE_FORMS_SCHEMA_CACHE_SIZE setting.
+    """
+
+    def __init__(self, max_size=None):
+        if max_size is None:
+            max_size = getattr(settings, 'REMOTE_FORMS_SCHEMA_CACHE_SIZE', DEFAULT_SCHEMA_CACHE_SIZE)
+
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                return None
+
+            # Move the entry to the most recently used end
+            self._entries[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedSchemaCache(object):
+    """
+    Shares schemas between processes through the Django cache alias set by
+    the REMOTE_FORMS_SHARED_SCHEMA_CACHE setting, so that only one worker
+    builds every schema after a deployment. It is disabled when the setting
+    isn't set.
+
+    Keys are namespaced by the package version, the form class path and the
+    REMOTE_FORMS_APP_VERSION setting, which should change whenever form
+    definitions do. Entries expire after REMOTE_FORMS_SHARED_SCHEMA_TIMEOUT
+    seconds, defaulting to the timeout of the cache alias.
+
+    When a schema is missing, the first worker adds a lock key and builds it
+    while the others wait up to lock_timeout seconds for it to appear before
+    building it themselves.
+    """
+
+    def __init__(self, alias=None, timeout=None, app_version=None, lock_timeout=DEFAULT_SCHEMA_LOCK_TIMEOUT):
+        self.alias = alias
+        self.timeout = timeout
+        self.app_version = app_version
+        self.lock_timeout = lock_timeout
+        self._cache = None
+
+    @property
+    def enabled(self):
+        return self.get_alias() is not None
+
+    def get_alias(self):
+        if self.alias is None:
+            return getattr(settings, 'REMOTE_FORMS_SHARED_SCHEMA_CACHE', None)
+
+        return self.alias
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_cache(self.get_alias())
+
+        return self._cache
+
+    def make_key(self, form_class, key):
+        if self.app_version is None:
+            app_version = getattr(settings, 'REMOTE_FORMS_APP_VERSION', '')
+        else:
+            app_version = self.app_version
+
+        return 'remote_forms:%s:%s:%s.%s:%s' % (
+            '.'.join(str(x) for x in __version__),
+            app_version,
+            form_class.__module__,
+            form_class.__name__,
+            # Sets are sorted for keys to be the same in every process
+            hashlib.sha1(repr([sorted(x) if isinstance(x, frozenset) else x for x in key])).hexdigest()
+        )
+
+    def set(self, cache_key, schema):
+        timeout = self.timeout
+        if timeout is None:
+            timeout = getattr(settings, 'REMOTE_FORMS_SHARED_SCHEMA_TIMEOUT', None)
+
+        try:
+            if timeout is None:
+                self.cache.set(cache_key, schema)
+            else:
+                self.cache.set(cache_key, schema, timeout)
+        except (pickle.PicklingError, cPickle.PicklingError, TypeError), e:
+            # e.g. fields of ComboFields holding unpicklable validators
+            logger.warning('Unable to share schema %s: %s', cache_key, e)
+
+    def get_or_build(self, form_class, key, build):
+        """
+        Returns the shared schema of key, built by build() when missing.
+        """
+        cache_key = self.make_key(form_class, key)
+
+        schema = self.cache.get(cache_key)
+        if schema is not None:
+            return schema
+
+        lock_key = '%s:lock' % cache_key
+        if self.cache.add(lock_key, 1, self.lock_timeout):
+            try:
+                schema = build()
+                self.set(cache_key, schema)
+            finally:
+                self.cache.delete(lock_key)
+
+            return schema
+
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(SCHEMA_LOCK_POLL_INTERVAL)
+
+            schema = self.cache.get(cache_key)
+            if schema is not None:
+                return schema
+
+            # The worker holding the lock failed without sharing the schema
+            if self.cache.get(lock_key) is None:
+                break
+
+        return build()
+
+
+class ChoiceCache(object):
+    """
+    Caches the evaluated choices of ModelChoiceFields and
+    ModelMultipleChoiceFields in the Django cache alias set by the
+    REMOTE_FORMS_CHOICE_CACHE setting, for the models registered with
+    register(), e.g. reference tables which rarely change:
+
+    choice_cache.register(Country)
+
+    Entries are keyed by the SQL of the queryset, the field and the active
+    language, along with a version of the model which the post_save,
+    post_delete and m2m_changed signals of the model replace, so that
+    changes of its rows or many to many relations made through model
+    instances are seen right away. QuerySet.update(), bulk_create() and raw
+    SQL send no signals, so call invalidate(model) after them. Changes of
+    related models a queryset filters on aren't seen either.
+
+    Signals are only sent in the process saving a model, so the alias must be
+    shared by every process, e.g. memcached, and models must be registered in
+    every process, e.g. in the models module of their app. Entries expire
+    after REMOTE_FORMS_CHOICE_CACHE_TIMEOUT seconds, defaulting to the
+    timeout of the cache alias.
+    """
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+        self.models = set()
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.get_alias() is not None
+
+    def get_alias(self):
+        if self.alias is None:
+            return getattr(settings, 'REMOTE_FORMS_CHOICE_CACHE', None)
+
+        return self.alias
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_cache(self.get_alias())
+
+        return self._cache
+
+    def get_timeout(self):
+        if self.timeout is None:
+            return getattr(settings, 'REMOTE_FORMS_CHOICE_CACHE_TIMEOUT', None)
+
+        return self.timeout
+
+    def register(self, model):
+        """
+        Caches the choices of querysets of model from now on.
+        """
+        with self._lock:
+            if model in self.models:
+                return
+            self.models.add(model)
+
+        dispatch_uid = 'remote_forms_choices_%s_%s' % (model._meta.app_label, model._meta.object_name)
+        signals.post_save.connect(self.invalidate, sender=model, weak=False, dispatch_uid=dispatch_uid)
+        signals.post_delete.connect(self.invalidate, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+        for field in model._meta.many_to_many:
+            signals.m2m_changed.connect(
+                self.invalidate_relation, sender=field.rel.through, weak=False, dispatch_uid=dispatch_uid
+            )
+
+    def make_version_key(self, model):
+        return 'remote_forms:choices:%s.%s:version' % (model._meta.app_label, model._meta.object_name)
+
+    def get_version(self, model):
+        version_key = self.make_version_key(model)
+
+        version = self.cache.get(version_key)
+        if version is None:
+            # A random version never brings back entries of a version which
+            # expired from the cache
+            self.cache.add(version_key, uuid.uuid4().hex)
+            version = self.cache.get(version_key)
+
+        return version
+
+    def invalidate(self, sender, **kwargs):
+        """
+        Discards the cached choices of model sender, e.g. after changing its
+        rows with QuerySet.update(), bulk_create() or raw SQL, which send no
+        signals.
+        """
+        if not self.enabled:
+            return
+
+        self.cache.set(self.make_version_key(sender), uuid.uuid4().hex)
+
+    def invalidate_relation(self, sender, instance, model, action, **kwargs):
+        if not self.enabled or not action.startswith('post_'):
+            return
+
+        # Either side of the relation may be the registered model
+        for changed_model in (instance.__class__, model):
+            if changed_model in self.models:
+                self.invalidate(changed_model)
+
+    def handles(self, choices):
+        return self.enabled and choices.queryset.model in self.models
+
+    def make_key(self, choices, version):
+        field = choices.field
+        queryset = choices.queryset
+        model = queryset.model
+
+        return 'remote_forms:choices:%s.%s:%s:%s' % (
+            model._meta.app_label,
+            model._meta.object_name,
+            version,
+            hashlib.sha1(repr((
+                unicode(queryset.query),
+                queryset.db,
+                field.__class__.__module__,
+                field.__class__.__name__,
+                field.to_field_name,
+                get_language(),
+            ))).hexdigest()
+        )
+
+    def get_choices(self, choices):
+        """
+        Returns the resolved (value, display) choices of a ModelChoiceIterator,
+        see handles(), from the cache when present.
+        """
+        field = choices.field
+
+        try:
+            cache_key = self.make_key(choices, self.get_version(choices.queryset.model))
+        except EmptyResultSet:
+            # The queryset can't match anything, e.g. filtered with pk__in=[]
+            cache_key = None
+
+        model_choices = None
+        if cache_key is not None:
+            model_choices = self.cache.get(cache_key)
+
+        if model_choices is None:
+            model_choices = [
+                (resolve_value(field.prepare_value(obj)), resolve_value(field.label_from_instance(obj)))
+                for obj in choices.queryset.all()
+            ]
+
+            if cache_key is not None:
+                timeout = self.get_timeout()
+                if timeout is None:
+                    self.cache.set(cache_key, model_choices)
+                else:
+                    self.cache.set(cache_key, model_choices, timeout)
+
+        # The empty choice depends on the field rather than on the queryset
+        if field.empty_label is not None:
+            return [(u'', resolve_value(field.empty_label))] + model_choices
+
+        return model_choices
+
+
+schema_cache = SchemaCache()
+shared_schema_cache = SharedSchemaCache()
+choice_cache = ChoiceCache()
@@ -0,0 +1,298 @@
+import base64
+import json
+import threading
+
+from multiprocessing.pool import ThreadPool
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.fields import FieldDoesNotExist
+from django.db import connections, transaction
+from django.db.models import Q
+from django.forms.models import ModelChoiceIterator
+from django.utils import translation
+
+from django_remote_forms import logger
+from django_remote_forms.cache import choice_cache
+from django_remote_forms.utils import resolve_value
+
+try:
+    from django.db import close_old_connections
+except ImportError:
+    close_old_connections = None
+
+
+class ChoicePage(object):
+    """
+    A list of resolved (value, display) choices. When paginated, cursor points
+    at the next page, or is None if there are no more choices.
+    """
+
+    def __init__(self, choices, cursor=None, paginated=False):
+        self.choices = choices
+        self.cursor = cursor
+        self.paginated = paginated
+
+
+def get_ordering(queryset):
+    """
+    Returns the (field name, descending) keys used for keyset pagination of
+    queryset: its ordering, up to the first entry which isn't a plain model
+    field, e.g. a relation, an annotation or '?', followed by the primary
+    key, which makes every key unique.
+    """
+    ordering = []
+    opts = queryset.model._meta
+    pk_names = ('pk', opts.pk.name)
+
+    for field_name in queryset.query.order_by or opts.ordering:
+        if not isinstance(field_name, basestring) or field_name == '?' or '__' in field_name:
+            break
+
+        descending = field_name.startswith('-')
+        field_name = field_name.lstrip('-')
+        if field_name in pk_names:
+            ordering.append(('pk', descending))
+            return ordering
+
+        try:
+            if opts.get_field(field_name).rel:
+                break
+        except FieldDoesNotExist:
+            break
+
+        ordering.append((field_name, descending))
+
+    # The primary key follows the direction of the last key, like it did
+    # when the queryset was ordered by a single field
+    ordering.append(('pk', ordering[-1][1] if ordering else False))
+    return ordering
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Returns the values of the ordering keys of the last row of a page held
+    by cursor, raising ValueError for cursors not made for ordering.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid choices cursor %r' % cursor)
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError('Invalid choices cursor %r' % cursor)
+
+    return values
+
+
+def get_keyset_filter(ordering, values):
+    """
+    Returns the filter of the rows following those whose ordering keys hold
+    values: those equal on the first keys and after them on the next one.
+    """
+    keyset_filter = Q()
+    equal = {}
+
+    for (field_name, descending), value in zip(ordering, values):
+        lookup = '%s__%s' % (field_name, 'lt' if descending else 'gt')
+        keyset_filter |= Q(**dict(equal, **{lookup: value}))
+        equal[field_name] = value
+
+    return keyset_filter
+
+
+def paginate_choices(field, page_size, cursor=None, search=None, search_fields=None):
+    """
+    Returns a ChoicePage for a ModelChoiceField or ModelMultipleChoiceField,
+    reading at most page_size rows from the field's queryset.
+
+    Pages are fetched with keyset pagination on the queryset ordering and the
+    primary key, see get_ordering, so that fetching a later page costs the
+    same as fetching the first one. Choices are in the order of the field's
+    choices, unless the queryset is ordered by related fields or randomly,
+    whose keys and the following ones are left out. Rows with a NULL
+    ordering value can't be paginated reliably. When search is given the
+    queryset is filtered with a case insensitive containment lookup on
+    search_fields, defaulting to the first ordering field unless that is the
+    primary key.
+    """
+    queryset = field.queryset
+
+    ordering = get_ordering(queryset)
+
+    if search:
+        if not search_fields:
+            if ordering[0][0] == 'pk':
+                raise ValueError('Searching %s choices requires search_fields' % queryset.model.__name__)
+            search_fields = [ordering[0][0]]
+
+        search_filter = Q()
+        for search_field in search_fields:
+            search_filter |= Q(**{'%s__icontains' % search_field: search})
+        queryset = queryset.filter(search_filter)
+
+    if cursor is not None:
+        queryset = queryset.filter(get_keyset_filter(ordering, decode_cursor(cursor, ordering)))
+
+    queryset = queryset.order_by(*[
+        '%s%s' % ('-' if descending else '', field_name) for field_name, descending in ordering
+    ])
+
+    objects = list(queryset[:page_size + 1])
+
+    next_cursor = None
+    if len(objects) > page_size:
+        objects = objects[:page_size]
+        last = objects[-1]
+        next_cursor = encode_cursor([getattr(last, field_name) for field_name, descending in ordering])
+
+    choices = [(field.prepare_value(obj), resolve_value(field.label_from_instance(obj))) for obj in objects]
+
+    # Only the first page carries the empty choice, like the full choice list
+    if cursor is None and not search and getattr(field, 'empty_label', None) is not None:
+        choices.insert(0, (u'', resolve_value(field.empty_label)))
+
+    return ChoicePage(choices, next_cursor, paginated=True)
+
+
+def build_choice_page(choices, context):
+    """
+    Returns a ChoicePage for the choices of a field or widget. Model choices
+    are paginated when the serialization context sets 'choices_page_size',
+    or else read from the choice cache when their model is registered.
+    """
+    if isinstance(choices, ModelChoiceIterator):
+        page_size = context.get('choices_page_size')
+        if page_size:
+            return paginate_choices(choices.field, page_size)
+
+        if choice_cache.handles(choices):
+            return ChoicePage(choice_cache.get_choices(choices))
+
+    # Iterate rather than calling list(), which would evaluate the
+    # queryset of model choices a second time through __len__
+    language = context.get('language')
+    return ChoicePage([(resolve_value(key, language), resolve_value(value, language)) for key, value in choices])
+
+
+def get_choice_page(choices, context, field_name):
+    """
+    Returns a ChoicePage for the choices of a field or widget, see
+    build_choice_page.
+
+    Pages are memoized per field name in the context, so that a field and its
+    widget, whose choices Django keeps in sync, only evaluate them once.
+    """
+    pages = context.setdefault('choice_pages', {})
+    if field_name not in pages:
+        pages[field_name] = build_choice_page(choices, context)
+
+    return pages[field_name]
+
+
+def shares_transaction(using):
+    """
+    Returns whether queries on the database using may depend on a transaction
+    of this thread, which connections of other threads can't see into: an
+    atomic block, a managed transaction, e.g. of TransactionMiddleware or a
+    TestCase, or an in-memory SQLite database, private to its connection.
+    """
+    connection = connections[using]
+
+    if hasattr(connection, 'in_atomic_block'):
+        if connection.in_atomic_block:
+            return True
+    elif transaction.is_managed(using=using):
+        return True
+
+    name = connection.settings_dict['NAME']
+    return connection.vendor == 'sqlite' and (not name or ':memory:' in name or 'mode=memory' in name)
+
+
+def release_connections():
+    """
+    Ends the transactions opened by the queries of this thread, keeping its
+    database connections open for the next request. Django versions with
+    persistent connections close those past CONN_MAX_AGE or unusable.
+    """
+    if close_old_connections is not None:
+        close_old_connections()
+        return
+
+    for connection in connections.all():
+        transaction.rollback_unless_managed(using=connection.alias)
+
+
+_thread_pools = {}
+_thread_pools_lock = threading.Lock()
+
+
+def get_thread_pool(threads):
+    """
+    Returns a pool of threads threads, created once per process so that the
+    database connections of its threads are reused across requests.
+    """
+    with _thread_pools_lock:
+        if threads not in _thread_pools:
+            _thread_pools[threads] = ThreadPool(threads)
+
+        return _thread_pools[threads]
+
+
+def prefetch_choice_pages(fields, context, threads):
+    """
+    Builds the choice pages of the model choice fields among fields, a list
+    of (name, field) pairs, concurrently in up to threads threads, and
+    memoizes them in the context for get_choice_page.
+
+    The queries of the fields then take about as long as the slowest one
+    rather than their sum. Every thread uses its own database connections,
+    reused between requests as release_connections allows, and the active
+    language of the caller.
+    Nothing is prefetched while a database queried shares a transaction with
+    the caller, see shares_transaction, as other threads would not see it.
+    """
+    pages = context.setdefault('choice_pages', {})
+    model_choices = [
+        (name, field.choices) for name, field in fields
+        if name not in pages and isinstance(getattr(field, 'choices', None), ModelChoiceIterator)
+    ]
+    if len(model_choices) < 2:
+        return
+
+    databases = set(choices.queryset.db for name, choices in model_choices)
+    if any(shares_transaction(using) for using in databases):
+        logger.debug('Not prefetching choices inside a transaction on %s', ', '.join(sorted(databases)))
+        return
+
+    language = translation.get_language()
+
+    def build(item):
+        name, choices = item
+        translation.activate(language)
+        try:
+            return name, build_choice_page(choices, context)
+        finally:
+            translation.deactivate()
+            release_connections()
+
+    pages.update(get_thread_pool(threads).map(build, model_choices))
+
+
+def serialize_choice_page(choice_page, context, field_name):
+    """
+    Returns the choices of the page as a list of dictionaries. When the
+    context holds a 'choice_table', the list is stored there once per field
+    and its key in the table is returned instead.
+    """
+    choice_table = context.get('choice_table')
+    if choice_table is None:
+        return [{'value': key, 'display': value} for key, value in choice_page.choices]
+
+    if field_name not in choice_table:
+        choice_table[field_name] = [{'value': key, 'display': value} for key, value in choice_page.choices]
+
+    return field_name
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+
+COMPACT_VERSION = 1
+
+ABSENT_KEY = '_'
+ESCAPE_PREFIX = '~'
+
+# Short keys by format version. Keys must never be reused with another meaning
+# within a version, add a new version instead.
+KEYS = {
+    1: {
+        # Field keys
+        'title': 't',
+        'required': 'r',
+        'label': 'l',
+        'initial': 'i',
+        'help_text': 'h',
+        'error_messages': 'e',
+        'widget': 'w',
+        'readonly': 'ro',
+        'max_length': 'xl',
+        'min_length': 'nl',
+        'max_value': 'xv',
+        'min_value': 'nv',
+        'max_digits': 'xd',
+        'decimal_places': 'dp',
+        'input_formats': 'if',
+        'choices': 'c',
+        'choices_cursor': 'cc',
+        'coerce': 'co',
+        'empty_value': 'ev',
+        'fields': 'f',
+
+        # Widget keys
+        'is_hidden': 'ih',
+        'needs_multipart_form': 'nm',
+        'is_localized': 'il',
+        'is_required': 'iq',
+        'attrs': 'a',
+        'input_type': 'it',
+        'format': 'fm',
+        'size': 's',
+        'check_test': 'ct',
+        'widgets': 'ws',
+        'date_format': 'df',
+        'time_format': 'tf',
+    }
+}
+
+FIELD_DEFAULTS = {
+    1: {
+        'required': True,
+        'label': None,
+        'initial': None,
+        'help_text': u'',
+    }
+}
+
+WIDGET_DEFAULTS = {
+    1: {
+        'is_hidden': False,
+        'needs_multipart_form': False,
+        'is_localized': False,
+        'is_required': True,
+        'attrs': {},
+    }
+}
+
+
+def is_default(value, default):
+    # Compare types too, so that e.g. 0 isn't mistaken for False
+    if default is None or isinstance(default, bool):
+        return value is default
+
+    return value.__class__ is default.__class__ and value == default
+
+
+class Compactor(object):
+    """
+    Compacts the field dictionaries of a single form, see RemoteForm's
+    compact option. Field and widget dictionaries are shortened by:
+
+    * leaving out the keys holding their default value, see FIELD_DEFAULTS
+      and WIDGET_DEFAULTS. Default keys that were genuinely missing from the
+      verbose dictionary are listed under ABSENT_KEY so that they are not
+      restored.
+    * storing every distinct error_messages dictionary once in a top level
+      'error_messages' list, fields holding its index instead.
+    * renaming known keys through a versioned key dictionary, see KEYS.
+      Other keys are kept as is, escaped with a '~' prefix when they could be
+      mistaken for a short key.
+    """
+
+    def __init__(self, version=COMPACT_VERSION):
+        self.version = version
+        self.keys = KEYS[version]
+        self.short_keys = frozenset(self.keys.values())
+        self.error_messages = []
+        self.error_message_indexes = {}
+
+    def compact_key(self, key):
+        try:
+            return self.keys[key]
+        except KeyError:
+            pass
+
+        if key in self.short_keys or key.startswith(ESCAPE_PREFIX):
+            return ESCAPE_PREFIX + key
+
+        return key
+
+    def compact_dict(self, source_dict, defaults, compact_value):
+        compact = OrderedDict()
+
+        for key, value in source_dict.items():
+            if key in defaults and is_default(value, defaults[key]):
+                continue
+            compact[self.compact_key(key)] = compact_value(key, value)
+
+        absent_keys = [self.keys[key] for key in defaults if key not in source_dict]
+        if absent_keys:
+            compact[ABSENT_KEY] = sorted(absent_keys)
+
+        return compact
+
+    def compact_field(self, field_dict):
+        return self.compact_dict(field_dict, FIELD_DEFAULTS[self.version], self.compact_field_value)
+
+    def compact_widget(self, widget_dict):
+        return self.compact_dict(widget_dict, WIDGET_DEFAULTS[self.version], self.compact_widget_value)
+
+    def compact_field_value(self, key, value):
+        if key == 'widget' and isinstance(value, dict):
+            return self.compact_widget(value)
+        if key == 'error_messages' and isinstance(value, dict):
+            return self.get_error_messages_index(value)
+
+        return value
+
+    def compact_widget_value(self, key, value):
+        if key == 'widgets' and isinstance(value, list):
+            return [self.compact_widget(widget_dict) for widget_dict in value]
+
+        return value
+
+    def get_error_messages_index(self, error_messages):
+        try:
+            table_key = tuple(sorted(error_messages.items()))
+            hash(table_key)
+        except TypeError:
+            # Messages that aren't plain strings can't be shared, keep them inline
+            return error_messages
+
+        if table_key not in self.error_message_indexes:
+            self.error_message_indexes[table_key] = len(self.error_messages)
+            self.error_messages.append(error_messages)
+
+        return self.error_message_indexes[table_key]
+
+
+class Expander(object):
+    """
+    Restores the verbose field dictionaries of a compact form dictionary.
+    Like those of the verbose format, field and widget dictionaries are plain
+    dictionaries, so that they compare equal whatever the order of the keys.
+    """
+
+    def __init__(self, version, error_messages):
+        if version not in KEYS:
+            raise ValueError('Unknown compact format version %r' % version)
+
+        self.version = version
+        self.verbose_keys = dict((short_key, key) for key, short_key in KEYS[version].items())
+        self.error_messages = error_messages
+
+    def expand_key(self, key):
+        if key.startswith(ESCAPE_PREFIX):
+            return key[len(ESCAPE_PREFIX):]
+
+        return self.verbose_keys.get(key, key)
+
+    def expand_dict(self, compact, defaults, expand_value):
+        absent_keys = set(self.expand_key(key) for key in compact.get(ABSENT_KEY, []))
+
+        verbose = {}
+        for key, value in compact.items():
+            if key != ABSENT_KEY:
+                key = self.expand_key(key)
+                verbose[key] = expand_value(key, value)
+
+        for key, default in defaults.items():
+            if key not in verbose and key not in absent_keys:
+                verbose[key] = default.copy() if isinstance(default, dict) else default
+
+        return verbose
+
+    def expand_field(self, compact):
+        return self.expand_dict(compact, FIELD_DEFAULTS[self.version], self.expand_field_value)
+
+    def expand_widget(self, compact):
+        return self.expand_dict(compact, WIDGET_DEFAULTS[self.version], self.expand_widget_value)
+
+    def expand_field_value(self, key, value):
+        if key == 'widget' and isinstance(value, dict):
+            return self.expand_widget(value)
+        if key == 'error_messages' and isinstance(value, (int, long)):
+            return dict(self.error_messages[value])
+
+        return value
+
+    def expand_widget_value(self, key, value):
+        if key == 'widgets' and isinstance(value, list):
+            return [self.expand_widget(widget_dict) for widget_dict in value]
+
+        return value
+
+
+def expand_form_dict(form_dict):
+    """
+    Returns the verbose form dictionary, as returned by RemoteForm.as_dict
+    without the compact option, equal to the compact form_dict it is given:
+
+    form_dict = expand_form_dict(json.loads(response.content))
+
+    Clients in other languages can follow the same steps: look up the short
+    keys of the 'compact' version, strip the '~' escape prefix from other
+    keys, replace error_messages indexes with the entries of the top level
+    'error_messages' list and add the default keys missing from every field
+    and widget, unless listed under '_'.
+    """
+    verbose = OrderedDict(form_dict)
+    expander = Expander(verbose.pop('compact'), verbose.pop('error_messages', []))
+
+    verbose['fields'] = OrderedDict(
+        (name, expander.expand_field(field_dict)) for name, field_dict in verbose['fields'].items()
+    )
+
+    return verbose
@@ -1,10 +1,16 @@
 import datetime
 
-from collections import OrderedDict
-
+from django import forms
 from django.conf import settings
 
+# Importing widgets registers the widget serializers
 from django_remote_forms import logger, widgets
+from django_remote_forms.choices import get_choice_page, serialize_choice_page
+from django_remote_forms.instrumentation import measure_widget, record_fallback
+from django_remote_forms.plans import Hook, run_plan
+from django_remote_forms.registry import field_serializers, widget_serializers
+from django_remote_forms.utils import get_callable_name, resolve_value
+from django_remote_forms.validation import compile_rules
 
 
 class RemoteField(object):
@@ -17,262 +23,276 @@ class RemoteField(object):
     specified on the field per Django's rules:
 
     https://docs.djangoproject.com/en/dev/ref/forms/api/#dynamic-initial-values
+
+    The keys of the dictionary are declared in ``attributes`` and extended by
+    subclasses. They are compiled once per class into a flat plan, see
+    django_remote_forms.plans.
+
+    Serializers are stateless: a single instance per class, see
+    registry.SerializerRegistry.get_serializer, serializes every field with
+    serialize(field, name, initial, context). Subclasses must declare empty
+    ``__slots__`` to stay free of per instance dictionaries.
+
+    Instances built with a field, as in RemoteField(field, ...).as_dict(),
+    are still supported.
     """
 
-    def __init__(self, field, form_initial_data=None, field_name=None):
+    __slots__ = ('field', 'form_initial_data', 'field_name', 'context')
+
+    attributes = (
+        ('title', '__class__.__name__'),
+        'required',
+        'label',
+        ('initial', Hook('serialize_initial')),
+        'help_text',
+        'error_messages',
+        ('widget', Hook('serialize_widget')),
+    )
+
+    def __init__(self, field=None, form_initial_data=None, field_name=None, context=None):
         self.field_name = field_name
         self.field = field
         self.form_initial_data = form_initial_data
+        self.context = context
 
-    def as_dict(self):
-        field_dict = OrderedDict()
-        field_dict['title'] = self.field.__class__.__name__
-        field_dict['required'] = self.field.required
-        field_dict['label'] = self.field.label
-        field_dict['initial'] = self.form_initial_data or self.field.initial
-        field_dict['help_text'] = self.field.help_text
+    def get_initial(self, field, initial):
+        return initial or field.initial
 
-        field_dict['error_messages'] = self.field.error_messages
+    def serialize_initial(self, field, field_dict, name, initial, context):
+        return resolve_value(self.get_initial(field, initial), context.get('language'))
 
-        # Instantiate the Remote Forms equivalent of the widget if possible
+    def serialize_widget(self, field, field_dict, name, initial, context):
+        # Fetch the Remote Forms equivalent of the widget if possible
         # in order to retrieve the widget contents as a dictionary.
-        remote_widget_class_name = 'Remote%s' % self.field.widget.__class__.__name__
-        try:
-            remote_widget_class = getattr(widgets, remote_widget_class_name)
-            remote_widget = remote_widget_class(self.field.widget, field_name=self.field_name)
-        except Exception, e:
-            logger.warning('Error serializing %s: %s', remote_widget_class_name, str(e))
-            widget_dict = {}
-        else:
-            widget_dict = remote_widget.as_dict()
-
-        field_dict['widget'] = widget_dict
+        widget = field.widget
+        remote_widget = widget_serializers.get_serializer(widget.__class__)
+        if remote_widget is None or not widget_serializers.is_registered(widget.__class__):
+            record_fallback(context, name, widget.__class__)
 
-        return field_dict
+        if remote_widget is None:
+            logger.warning('No serializer registered for widget %s', widget.__class__.__name__)
+            return {}
 
+        collector = context.get('collector')
+        if collector is not None and collector.enabled:
+            with measure_widget(context, name, widget):
+                return remote_widget.serialize(widget, name, context)
 
-class RemoteCharField(RemoteField):
-    def as_dict(self):
-        field_dict = super(RemoteCharField, self).as_dict()
+        return remote_widget.serialize(widget, name, context)
 
-        field_dict.update({
-            'max_length': self.field.max_length,
-            'min_length': self.field.min_length
-        })
+    def serialize(self, field, name, initial, context):
+        """
+        Returns the dictionary of field, named name in its form. initial is
+        the initial value of the field passed to the form, if any.
+        """
+        field_dict = run_plan(self, field, name, initial, context)
 
-        return field_dict
+        if context.get('validation_rules'):
+            field_dict['validators'] = compile_rules(field, name, context)
 
+        return field_dict
 
-class RemoteIntegerField(RemoteField):
     def as_dict(self):
-        field_dict = super(RemoteIntegerField, self).as_dict()
+        context = self.context if self.context is not None else {}
+        return self.serialize(self.field, self.field_name, self.form_initial_data, context)
 
-        field_dict.update({
-            'max_value': self.field.max_value,
-            'min_value': self.field.min_value
-        })
 
-        return field_dict
+class RemoteCharField(RemoteField):
+    __slots__ = ()
+
+    attributes = ('max_length', 'min_length')
+
+
+class RemoteIntegerField(RemoteField):
+    __slots__ = ()
+
+    attributes = ('max_value', 'min_value')
 
 
 class RemoteFloatField(RemoteIntegerField):
-    def as_dict(self):
-        return super(RemoteFloatField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteDecimalField(RemoteIntegerField):
-    def as_dict(self):
-        field_dict = super(RemoteDecimalField, self).as_dict()
+    __slots__ = ()
 
-        field_dict.update({
-            'max_digits': self.field.max_digits,
-            'decimal_places': self.field.decimal_places
-        })
-
-        return field_dict
+    attributes = ('max_digits', 'decimal_places')
 
 
 class RemoteTimeField(RemoteField):
-    def as_dict(self):
-        field_dict = super(RemoteTimeField, self).as_dict()
+    __slots__ = ()
 
-        field_dict['input_formats'] = self.field.input_formats
+    attributes = (
+        ('input_formats', Hook('serialize_input_formats')),
+    )
 
-        if (field_dict['initial']):
-            if callable(field_dict['initial']):
-                field_dict['initial'] = field_dict['initial']()
+    def get_raw_initial(self, field, initial):
+        initial = super(RemoteTimeField, self).get_initial(field, initial)
 
-            # If initial value is datetime then convert it using first available input format
-            if (isinstance(field_dict['initial'], (datetime.datetime, datetime.time, datetime.date))):
-                if not len(field_dict['input_formats']):
-                    if isinstance(field_dict['initial'], datetime.date):
-                        field_dict['input_formats'] = settings.DATE_INPUT_FORMATS
-                    elif isinstance(field_dict['initial'], datetime.time):
-                        field_dict['input_formats'] = settings.TIME_INPUT_FORMATS
-                    elif isinstance(field_dict['initial'], datetime.datetime):
-                        field_dict['input_formats'] = settings.DATETIME_INPUT_FORMATS
+        if initial and callable(initial):
+            initial = initial()
 
-                input_format = field_dict['input_formats'][0]
-                field_dict['initial'] = field_dict['initial'].strftime(input_format)
+        return initial
 
-        return field_dict
+    def get_input_formats(self, field, initial):
+        input_formats = field.input_formats
+
+        initial = self.get_raw_initial(field, initial)
+        if initial and not len(input_formats):
+            if isinstance(initial, datetime.date):
+                input_formats = settings.DATE_INPUT_FORMATS
+            elif isinstance(initial, datetime.time):
+                input_formats = settings.TIME_INPUT_FORMATS
+            elif isinstance(initial, datetime.datetime):
+                input_formats = settings.DATETIME_INPUT_FORMATS
+
+        return input_formats
+
+    def get_initial(self, field, initial):
+        initial = self.get_raw_initial(field, initial)
+
+        # If initial value is datetime then convert it using first available input format
+        if (isinstance(initial, (datetime.datetime, datetime.time, datetime.date))):
+            input_format = self.get_input_formats(field, initial)[0]
+            initial = initial.strftime(input_format)
+
+        return initial
+
+    def serialize_input_formats(self, field, field_dict, name, initial, context):
+        return resolve_value(self.get_input_formats(field, initial), context.get('language'))
 
 
 class RemoteDateField(RemoteTimeField):
-    def as_dict(self):
-        return super(RemoteDateField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteDateTimeField(RemoteTimeField):
-    def as_dict(self):
-        return super(RemoteDateTimeField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteRegexField(RemoteCharField):
-    def as_dict(self):
-        field_dict = super(RemoteRegexField, self).as_dict()
-
-        # We don't need the pattern object in the frontend
-        # field_dict['regex'] = self.field.regex
-
-        return field_dict
+    # The pattern object isn't serialized, pass validation_rules=True to
+    # RemoteForm for the pattern as a client side rule
+    __slots__ = ()
 
 
 class RemoteEmailField(RemoteCharField):
-    def as_dict(self):
-        return super(RemoteEmailField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteFileField(RemoteField):
-    def as_dict(self):
-        field_dict = super(RemoteFileField, self).as_dict()
+    __slots__ = ()
 
-        field_dict['max_length'] = self.field.max_length
-
-        return field_dict
+    attributes = ('max_length',)
 
 
 class RemoteImageField(RemoteFileField):
-    def as_dict(self):
-        return super(RemoteImageField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteURLField(RemoteCharField):
-    def as_dict(self):
-        return super(RemoteURLField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteBooleanField(RemoteField):
-    def as_dict(self):
-        return super(RemoteBooleanField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteNullBooleanField(RemoteBooleanField):
-    def as_dict(self):
-        return super(RemoteNullBooleanField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteChoiceField(RemoteField):
-    def as_dict(self):
-        field_dict = super(RemoteChoiceField, self).as_dict()
+    __slots__ = ()
+
+    attributes = (
+        ('choices', Hook('serialize_choices')),
+    )
+
+    def serialize_choices(self, field, field_dict, name, initial, context):
+        choice_page = get_choice_page(field.choices, context, name)
+        return serialize_choice_page(choice_page, context, name)
 
-        field_dict['choices'] = []
-        for key, value in self.field.choices:
-            field_dict['choices'].append({
-                'value': key,
-                'display': value
-            })
+    def serialize(self, field, name, initial, context):
+        field_dict = super(RemoteChoiceField, self).serialize(field, name, initial, context)
+
+        # Paginated model choices point at the next page, see choices.paginate_choices
+        choice_page = get_choice_page(field.choices, context, name)
+        if choice_page.paginated:
+            field_dict['choices_cursor'] = choice_page.cursor
 
         return field_dict
 
 
 class RemoteModelChoiceField(RemoteChoiceField):
-    def as_dict(self):
-        return super(RemoteModelChoiceField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteTypedChoiceField(RemoteChoiceField):
-    def as_dict(self):
-        field_dict = super(RemoteTypedChoiceField, self).as_dict()
+    __slots__ = ()
 
-        field_dict.update({
-            'coerce': self.field.coerce,
-            'empty_value': self.field.empty_value
-        })
+    attributes = (
+        ('coerce', Hook('serialize_coerce')),
+        'empty_value',
+    )
 
-        return field_dict
+    def serialize_coerce(self, field, field_dict, name, initial, context):
+        # The coercion function is named rather than called
+        return get_callable_name(field.coerce)
 
 
 class RemoteMultipleChoiceField(RemoteChoiceField):
-    def as_dict(self):
-        return super(RemoteMultipleChoiceField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteModelMultipleChoiceField(RemoteMultipleChoiceField):
-    def as_dict(self):
-        return super(RemoteModelMultipleChoiceField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteTypedMultipleChoiceField(RemoteMultipleChoiceField):
-    def as_dict(self):
-        field_dict = super(RemoteTypedMultipleChoiceField, self).as_dict()
+    __slots__ = ()
 
-        field_dict.update({
-            'coerce': self.field.coerce,
-            'empty_value': self.field.empty_value
-        })
+    attributes = (
+        ('coerce', Hook('serialize_coerce')),
+        'empty_value',
+    )
 
-        return field_dict
+    serialize_coerce = RemoteTypedChoiceField.serialize_coerce.__func__
 
 
 class RemoteComboField(RemoteField):
-    def as_dict(self):
-        field_dict = super(RemoteComboField, self).as_dict()
+    __slots__ = ()
 
-        field_dict.update(fields=self.field.fields)
-
-        return field_dict
+    attributes = ('fields',)
 
 
 class RemoteMultiValueField(RemoteField):
-    def as_dict(self):
-        field_dict = super(RemoteMultiValueField, self).as_dict()
-
-        field_dict['fields'] = self.field.fields
+    __slots__ = ()
 
-        return field_dict
+    attributes = ('fields',)
 
 
 class RemoteFilePathField(RemoteChoiceField):
-    def as_dict(self):
-        field_dict = super(RemoteFilePathField, self).as_dict()
+    __slots__ = ()
 
-        field_dict.update({
-            'path': self.field.path,
-            'match': self.field.match,
-            'recursive': self.field.recursive
-        })
-
-        return field_dict
+    attributes = ('path', 'match', 'recursive')
 
 
 class RemoteSplitDateTimeField(RemoteMultiValueField):
-    def as_dict(self):
-        field_dict = super(RemoteSplitDateTimeField, self).as_dict()
+    __slots__ = ()
 
-        field_dict.update({
-            'input_date_formats': self.field.input_date_formats,
-            'input_time_formats': self.field.input_time_formats
-        })
-
-        return field_dict
+    attributes = ('input_date_formats', 'input_time_formats')
 
 
 class RemoteIPAddressField(RemoteCharField):
-    def as_dict(self):
-        return super(RemoteIPAddressField, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteSlugField(RemoteCharField):
-    def as_dict(self):
-        return super(RemoteSlugField, self).as_dict()
+    __slots__ = ()
+
+
+field_serializers.register_by_name(
+    [x for x in globals().values() if isinstance(x, type) and issubclass(x, RemoteField)],
+    forms.fields, forms.models
+)
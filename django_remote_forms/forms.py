@@ -1,12 +1,75 @@
 from collections import OrderedDict
 
-from django_remote_forms import fields, logger
-from django_remote_forms.utils import resolve_promise
+from django.core.exceptions import ValidationError
+from django.forms import FileField
+from django.forms.util import ErrorDict
+from django.utils.translation import get_language
+
+# Importing fields registers the field and widget serializers
+from django_remote_forms import __version__, fields, logger
+from django_remote_forms.backends import JSONBackend, RemoteJSONEncoder
+from django_remote_forms.cache import schema_cache, shared_schema_cache
+from django_remote_forms.choices import prefetch_choice_pages
+from django_remote_forms.compact import Compactor
+from django_remote_forms.instrumentation import get_collector, measure_field, record_fallback
+from django_remote_forms.registry import field_serializers, get_serializer_instance
+from django_remote_forms.utils import fingerprint, resolve_value
 
 
 class RemoteForm(object):
+    """
+    Serializes a Django form into a Python dictionary.
+
+    Passing cache=True stores the resolved field and widget metadata per form
+    class, serialization options and language, see cache.SchemaCache, so that
+    subsequent calls only compute the per request parts of the output
+    (errors, data, initial values and bound state). Only enable it for forms
+    that don't alter their fields per instance, e.g. by assigning choices or
+    labels in __init__. The field dictionaries returned are then shared with
+    the cache and must not be modified.
+
+    Passing choices_page_size limits the choices of ModelChoiceFields and
+    ModelMultipleChoiceFields to their first page of that size, along with a
+    'choices_cursor' for fetching the following pages with
+    django_remote_forms.views.choices_response.
+
+    Passing choice_table=True stores every choice list once in a top level
+    'choices' dictionary keyed by field name, and sets the 'choices' of
+    fields and widgets to that key instead of repeating the list.
+
+    Passing only=[field names] or fieldset=<fieldset name> serializes those
+    fields only, e.g. to send the fields of a large form one fieldset at a
+    time after its index, see as_index().
+
+    Passing validation_rules=True adds the 'validators' of every field, rules
+    compiled from Field.validators which clients can check before
+    submitting, see validation.compile_rules.
+
+    Passing prefetch_choices=<number of threads> evaluates the querysets of
+    ModelChoiceFields and ModelMultipleChoiceFields concurrently, so that
+    forms with several of them wait for the slowest query only.
+
+    Passing compact=True leaves default values out of field and widget
+    dictionaries, shares identical error_messages and shortens their keys,
+    see compact.Compactor. compact.expand_form_dict restores the verbose
+    dictionary.
+    """
+
     def __init__(self, form, *args, **kwargs):
         self.form = form
+        self.use_cache = kwargs.pop('cache', False)
+        self.compact = kwargs.pop('compact', False)
+        self.collector = kwargs.pop('collector', None) or get_collector()
+        self.prefetch_choices = kwargs.pop('prefetch_choices', None)
+
+        # Options shared by the field and widget serializers
+        self.options = {
+            'choices_page_size': kwargs.pop('choices_page_size', None),
+            'choice_table': kwargs.pop('choice_table', False),
+            'validation_rules': kwargs.pop('validation_rules', False)
+        }
+        self.context = self.new_context()
+        self.schema = None
 
         self.all_fields = set(self.form.fields.keys())
 
@@ -17,6 +80,10 @@ class RemoteForm(object):
 
         self.fieldsets = kwargs.pop('fieldsets', {})
 
+        # Restrict the serialized fields, the index lists all of them
+        only_fields = kwargs.pop('only', None)
+        only_fieldset = kwargs.pop('fieldset', None)
+
         # Make sure all passed field lists are valid
         if self.excluded_fields and not (self.all_fields >= self.excluded_fields):
             logger.warning(
@@ -38,17 +105,18 @@ class RemoteForm(object):
                 'Readonly fields %s are not present in form fields' % (set(self.ordered_fields) - self.all_fields))
             self.ordered_fields = []
 
-        if self.included_fields | self.excluded_fields:
+        if self.included_fields & self.excluded_fields:
             logger.warning(
                 'Included and excluded fields have following fields %s in common' % (
-                    set(self.ordered_fields) - self.all_fields
+                    self.included_fields & self.excluded_fields
                 )
             )
             self.excluded_fields = set()
             self.included_fields = set()
 
         # Extend exclude list from include list
-        self.excluded_fields |= (self.included_fields - self.all_fields)
+        if self.included_fields:
+            self.excluded_fields |= (self.all_fields - self.included_fields)
 
         if not self.ordered_fields:
             if hasattr(self.form.fields, 'keyOrder'):
@@ -80,6 +148,18 @@ class RemoteForm(object):
             logger.warning('Following fieldset fields are excluded %s' % (fieldset_fields - set(self.fields)))
             self.fieldsets = {}
 
+        self.index_fields = self.fields
+
+        if only_fieldset is not None:
+            only_fields = self.get_fieldset_fields(only_fieldset)
+
+        if only_fields is not None:
+            if not (set(self.fields) >= set(only_fields)):
+                logger.warning('Only fields %s are not serialized fields' % (set(only_fields) - set(self.fields)))
+
+            only_fields = set(only_fields)
+            self.fields = [name for name in self.fields if name in only_fields]
+
     def as_dict(self):
         """
         Returns a form as a dictionary that looks like the following:
@@ -107,57 +187,508 @@ class RemoteForm(object):
             }
         }
         """
+        form_dict = OrderedDict()
+
+        for key, value in self.iter_items():
+            if key == 'fields':
+                value = OrderedDict(value)
+            form_dict[key] = value
+
+        return form_dict
+
+    def as_index(self):
+        """
+        Returns the names of the serialized fields, in order, and of the
+        fields of each fieldset, without serializing any field, so that a
+        client can render the layout of a form right away and fetch the
+        fields of each fieldset when shown, see the 'fieldset' option:
+
+        form = {
+            'title': 'text',
+            'prefix': 'text',
+            'ordered_fields': ['name', ...],
+            'fieldsets': [
+                {'name': 'text', 'fields': ['name', ...]}
+            ]
+        }
+
+        The index lists every field serialized without the 'only' and
+        'fieldset' options.
+        """
+        index_fields = set(self.index_fields)
+
         form_dict = OrderedDict()
         form_dict['title'] = self.form.__class__.__name__
-        form_dict['non_field_errors'] = self.form.non_field_errors()
-        form_dict['label_suffix'] = self.form.label_suffix
-        form_dict['is_bound'] = self.form.is_bound
         form_dict['prefix'] = self.form.prefix
-        form_dict['fields'] = OrderedDict()
-        form_dict['errors'] = self.form.errors
-        form_dict['fieldsets'] = getattr(self.form, 'fieldsets', [])
+        form_dict['ordered_fields'] = self.index_fields
+        form_dict['fieldsets'] = [
+            {
+                'name': resolve_value(fieldset_name),
+                'fields': [name for name in fieldset_data.get('fields', []) if name in index_fields]
+            }
+            for fieldset_name, fieldset_data in self.get_fieldsets()
+        ]
 
-        # If there are no fieldsets, specify order
-        form_dict['ordered_fields'] = self.fields
+        return form_dict
 
-        initial_data = {}
+    def as_delta(self):
+        """
+        Returns the per request parts of the form dictionary only, along with
+        the fingerprint of the field definitions, for clients that already
+        hold the definitions from a previous as_dict() call, e.g. to report
+        validation errors after a POST:
 
-        for name, field in [(x, self.form.fields[x]) for x in self.fields]:
-            # Retrieve the initial data from the form itself if it exists so
-            # that we properly handle which initial data should be returned in
-            # the dictionary.
+        form = {
+            'is_bound': True,
+            'non_field_errors': [],
+            'errors': {},
+            'data': {},
+            'fingerprint': 'text'
+        }
+
+        Clients should fetch the full form again once the fingerprint changes.
+        Use it with cache=True, otherwise the whole schema is built on every
+        call just to compute the fingerprint.
+        """
+        if not self.use_cache:
+            logger.warning('%s.as_delta() builds the whole schema without cache=True', self.form.__class__.__name__)
+
+        form_dict = OrderedDict()
+        form_dict['is_bound'] = self.form.is_bound
+        form_dict['non_field_errors'] = resolve_value(self.form.non_field_errors())
+        form_dict['errors'] = resolve_value(self.form.errors)
+
+        if self.form.data:
+            form_dict['data'] = resolve_value(self.form.data)
+        else:
+            form_dict['data'] = self.get_initial_data()
 
-            # Please refer to the Django Form API documentation for details on
-            # why this is necessary:
-            # https://docs.djangoproject.com/en/dev/ref/forms/api/#dynamic-initial-values
-            form_initial_field_data = self.form.initial.get(name)
+        form_dict['fingerprint'] = self.fingerprint()
 
-            # Instantiate the Remote Forms equivalent of the field if possible
-            # in order to retrieve the field contents as a dictionary.
-            remote_field_class_name = 'Remote%s' % field.__class__.__name__
+        return form_dict
+
+    def validate_fields(self, field_names, clean_form=False):
+        """
+        Cleans the named fields of the bound form only, running Field.clean()
+        and the form's clean_<name>() hook of each, and returns their errors,
+        e.g. to validate a single input as the user leaves it:
+
+        form = {
+            'is_valid': False,
+            'errors': {'email': ['Enter a valid e-mail address.']},
+            'non_field_errors': []
+        }
+
+        The form wide clean() only runs when clean_form is True, with the
+        cleaned data of the named fields. Like for Form.full_clean(), the
+        errors and cleaned_data of the form hold the results afterwards, and
+        clean_<name>() hooks only see the cleaned data of fields cleaned
+        before them. Only the fields of the remote form can be validated,
+        naming any other field raises ValueError.
+        """
+        form = self.form
+
+        unknown_names = [name for name in field_names if name not in self.fields]
+        if unknown_names:
+            raise ValueError('Unknown fields %s' % ', '.join(unknown_names))
+
+        form_dict = OrderedDict()
+        form_dict['is_valid'] = False
+        form_dict['errors'] = {}
+        form_dict['non_field_errors'] = []
+
+        if not form.is_bound:
+            return form_dict
+
+        fields = [(name, form.fields[name]) for name in field_names]
+
+        form._errors = ErrorDict()
+        form.cleaned_data = {}
+
+        for name, field in fields:
+            value = field.widget.value_from_datadict(form.data, form.files, form.add_prefix(name))
             try:
-                remote_field_class = getattr(fields, remote_field_class_name)
-                remote_field = remote_field_class(field, form_initial_field_data, field_name=name)
-            except Exception, e:
-                logger.warning('Error serializing field %s: %s', remote_field_class_name, str(e))
-                field_dict = {}
+                if isinstance(field, FileField):
+                    value = field.clean(value, form.initial.get(name, field.initial))
+                else:
+                    value = field.clean(value)
+                form.cleaned_data[name] = value
+
+                if hasattr(form, 'clean_%s' % name):
+                    form.cleaned_data[name] = getattr(form, 'clean_%s' % name)()
+            except ValidationError, e:
+                form._errors[name] = form.error_class(e.messages)
+                form.cleaned_data.pop(name, None)
+
+        if clean_form:
+            form._clean_form()
+
+        form_dict['is_valid'] = not form._errors
+        form_dict['errors'] = resolve_value(form._errors)
+        form_dict['non_field_errors'] = resolve_value(form.non_field_errors())
+
+        return form_dict
+
+    def get_fieldsets(self):
+        """
+        Returns the fieldsets passed to RemoteForm, or those of the form, as
+        (name, {'fields': [...]}) pairs.
+        """
+        return self.fieldsets or getattr(self.form, 'fieldsets', None) or []
+
+    def get_fieldset_fields(self, fieldset):
+        for fieldset_name, fieldset_data in self.get_fieldsets():
+            if resolve_value(fieldset_name) == fieldset:
+                return fieldset_data.get('fields', [])
+
+        raise ValueError('Unknown fieldset %s' % fieldset)
+
+    def as_json(self):
+        """
+        Returns the JSON representation of as_dict() as a string, in a single
+        pass: values serializers leave as is, like lazy translations, dates,
+        decimals, callables and the subfields of ComboFields, are encoded by
+        backends.encode_default without resolving the dictionary first.
+        simplejson is used when installed, and cached schemas are encoded
+        once, see iter_encoded.
+        """
+        return self.encode(JSONBackend())
+
+    def iter_json(self, encoder_class=RemoteJSONEncoder):
+        """
+        Yields the JSON representation of as_dict() in chunks, one chunk per
+        field, so that a response can start sending the form right away and
+        only a single serialized field is held in memory at a time:
+
+        response = StreamingHttpResponse(remote_form.iter_json(), content_type='application/json')
+        """
+        return self.iter_encoded(JSONBackend(encoder_class))
+
+    def iter_encoded(self, backend=None):
+        """
+        Yields the representation of as_dict() encoded by backend in chunks,
+        see backends.Backend. Defaults to JSON.
+
+        With the cache enabled, the encoded fields are cached along with the
+        schema, split around their initial value, so that only the initial
+        values are encoded per request.
+        """
+        if backend is None:
+            backend = JSONBackend()
+
+        templates = None
+        if self.use_cache and not self.compact:
+            templates = self.get_templates(backend)
+
+        def iter_field_chunks(name, field_dict):
+            if templates is None:
+                yield backend.encode(field_dict)
             else:
-                field_dict = remote_field.as_dict()
+                before, after = templates['fields'][name]
+                yield before
+                yield backend.encode(field_dict['initial'])
+                yield after
+
+        def iter_values():
+            for key, value in self.iter_items():
+                if key == 'fields':
+                    yield key, backend.iter_map(
+                        (name, iter_field_chunks(name, field_dict)) for name, field_dict in value
+                    )
+                elif key == 'choices' and templates is not None:
+                    yield key, [templates['choices']]
+                else:
+                    yield key, [backend.encode(value)]
+
+        if not self.collector.enabled:
+            return backend.iter_map(iter_values())
+
+        return self.iter_measured(backend.iter_map(iter_values()))
+
+    def iter_measured(self, chunks):
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+
+        self.collector.record_output(self.context['form_name'], size)
+
+    def encode(self, backend=None):
+        """
+        Returns the representation of as_dict() encoded by backend.
+        """
+        return ''.join(self.iter_encoded(backend))
+
+    def get_templates(self, backend):
+        """
+        Returns the cached schema encoded by backend, see iter_encoded.
+        """
+        schema = self.get_cached_schema()
+        all_templates = schema.setdefault('templates', {})
+
+        if backend.template_key not in all_templates:
+            all_templates[backend.template_key] = {
+                'fields': dict(
+                    (name, backend.split_map(field_dict.items(), 'initial'))
+                    for name, field_dict in schema['fields'].items()
+                ),
+                'choices': backend.encode(schema['choices'])
+            }
+
+        return all_templates[backend.template_key]
+
+    def iter_items(self):
+        """
+        Yields the resolved (key, value) pairs of the form dictionary in order.
+        The value for 'fields' is an iterator of (name, field dictionary) pairs
+        which must be consumed before the following items are requested, as
+        the initial data is collected along the way.
+        """
+        self.context = self.new_context()
+
+        initial_data = {}
+        compactor = Compactor() if self.compact else None
+
+        def iter_fields():
+            for name, field_dict in self.iter_fields():
+                initial_data[name] = field_dict['initial']
+
+                if compactor is not None:
+                    field_dict = compactor.compact_field(field_dict)
 
-            if name in self.readonly_fields:
-                field_dict['readonly'] = True
+                yield name, field_dict
 
-            form_dict['fields'][name] = field_dict
+        if compactor is not None:
+            yield 'compact', compactor.version
 
-            # Load the initial data, which is a conglomerate of form initial and field initial
-            if 'initial' not in form_dict['fields'][name]:
-                form_dict['fields'][name]['initial'] = None
+        yield 'title', self.form.__class__.__name__
+        yield 'non_field_errors', resolve_value(self.form.non_field_errors())
+        yield 'label_suffix', resolve_value(self.form.label_suffix)
+        yield 'is_bound', self.form.is_bound
+        yield 'prefix', self.form.prefix
+        yield 'fields', iter_fields()
 
-            initial_data[name] = form_dict['fields'][name]['initial']
+        if self.context['choice_table'] is not None:
+            yield 'choices', self.context['choice_table']
+
+        if compactor is not None:
+            yield 'error_messages', compactor.error_messages
+
+        yield 'errors', resolve_value(self.form.errors)
+        yield 'fieldsets', resolve_value(getattr(self.form, 'fieldsets', []))
+
+        # If there are no fieldsets, specify order
+        yield 'ordered_fields', self.fields
 
         if self.form.data:
-            form_dict['data'] = self.form.data
+            yield 'data', resolve_value(self.form.data)
+        else:
+            yield 'data', initial_data
+
+    def iter_fields(self):
+        """
+        Yields (name, field dictionary) pairs for the serialized fields, taken
+        from the schema cache when enabled.
+        """
+        if not self.use_cache:
+            self.prefetch_choice_pages()
+            for name in self.fields:
+                field_dict, remote_field_class = self.serialize_field(name)
+                yield name, field_dict
+            return
+
+        schema = self.get_cached_schema()
+        self.context['choice_table'] = schema['choices']
+
+        for name, field_dict in schema['fields'].items():
+            # The cached field dictionary is shared between requests, so a
+            # different initial value for this form is set on a copy
+            initial = self.get_field_initial(name, schema['serializers'][name])
+            if initial != field_dict['initial']:
+                field_dict = field_dict.copy()
+                field_dict['initial'] = initial
+            yield name, field_dict
+
+    def new_context(self):
+        """
+        Returns the context shared by the serializers during one serialization
+        of the form: the options along with the memoized choices and the
+        active language.
+        """
+        context = dict(self.options)
+        context['choice_pages'] = {}
+        context['choice_table'] = OrderedDict() if self.options['choice_table'] else None
+        context['collector'] = self.collector
+        context['form_name'] = '%s.%s' % (self.form.__class__.__module__, self.form.__class__.__name__)
+        context['language'] = get_language()
+        return context
+
+    def prefetch_choice_pages(self):
+        """
+        Evaluates the choices of model choice fields concurrently when the
+        prefetch_choices option sets a number of threads, see
+        choices.prefetch_choice_pages.
+        """
+        if self.prefetch_choices:
+            prefetch_choice_pages(
+                [(name, self.form.fields[name]) for name in self.fields], self.context, self.prefetch_choices
+            )
+
+    def get_schema(self):
+        """
+        Returns the cached schema, or one built once per RemoteForm instance
+        when the cache is disabled.
+        """
+        if self.use_cache:
+            return self.get_cached_schema()
+
+        if self.schema is None:
+            self.schema = self.build_schema()
+
+        return self.schema
+
+    def fingerprint(self):
+        """
+        Returns a stable hash of the static part of the form dictionary, i.e.
+        everything but errors, data, initial values and bound state. It is
+        computed once per cached schema, so it is only cheap with cache=True.
+        """
+        schema = self.get_schema()
+
+        if 'fingerprint' not in schema:
+            schema['fingerprint'] = fingerprint(
+                __version__,
+                self.form.__class__.__name__,
+                resolve_value(getattr(self.form, 'fieldsets', [])),
+                self.fields,
+                [
+                    (name, [(key, value) for key, value in field_dict.items() if key != 'initial'])
+                    for name, field_dict in schema['fields'].items()
+                ],
+                schema['choices']
+            )
+
+        return schema['fingerprint']
+
+    def get_initial_data(self):
+        """
+        Returns the resolved initial value of every serialized field.
+        """
+        schema = self.get_schema()
+        return dict((name, self.get_field_initial(name, schema['serializers'][name])) for name in self.fields)
+
+    def get_etag(self):
+        """
+        Returns an ETag for the form dictionary, made of the schema fingerprint
+        and a hash of the per request parts of the output.
+        """
+        request_fingerprint = fingerprint(
+            self.compact,
+            resolve_value(self.form.non_field_errors()),
+            resolve_value(self.form.label_suffix),
+            self.form.is_bound,
+            self.form.prefix,
+            resolve_value(self.form.errors),
+            resolve_value(self.form.data),
+            self.get_initial_data()
+        )
+
+        return '%s-%s' % (self.fingerprint(), request_fingerprint)
+
+    def get_cache_key(self):
+        # Cached schemas hold resolved translations
+        return (
+            self.form.__class__, tuple(self.fields), frozenset(self.readonly_fields),
+            tuple(sorted(self.options.items())), get_language()
+        )
+
+    def get_cached_schema(self):
+        cache_key = self.get_cache_key()
+
+        schema = schema_cache.get(cache_key)
+        if schema is None:
+            if shared_schema_cache.enabled:
+                schema = shared_schema_cache.get_or_build(self.form.__class__, cache_key[1:], self.build_schema)
+            else:
+                schema = self.build_schema()
+            schema_cache.set(cache_key, schema)
+
+        return schema
+
+    def get_remote_field_class(self, field):
+        remote_field_class = field_serializers.get(field.__class__)
+        if remote_field_class is None:
+            logger.warning('No serializer registered for field %s', field.__class__.__name__)
+
+        return remote_field_class
+
+    def get_field_initial(self, name, remote_field_class):
+        if remote_field_class is None:
+            return None
+
+        remote_field = get_serializer_instance(remote_field_class)
+        return resolve_value(remote_field.get_initial(self.form.fields[name], self.form.initial.get(name)))
+
+    def serialize_field(self, name):
+        """
+        Returns the dictionary for the named field along with the remote field
+        class used to build it.
+        """
+        field = self.form.fields[name]
+
+        # Retrieve the initial data from the form itself if it exists so
+        # that we properly handle which initial data should be returned in
+        # the dictionary.
+
+        # Please refer to the Django Form API documentation for details on
+        # why this is necessary:
+        # https://docs.djangoproject.com/en/dev/ref/forms/api/#dynamic-initial-values
+        form_initial_field_data = self.form.initial.get(name)
+
+        # Fetch the Remote Forms equivalent of the field if possible
+        # in order to retrieve the field contents as a dictionary.
+        remote_field_class = self.get_remote_field_class(field)
+        if remote_field_class is None or not field_serializers.is_registered(field.__class__):
+            # Fields are serialized by the serializer of their closest ancestor when possible
+            record_fallback(self.context, name, field.__class__)
+
+        if remote_field_class is None:
+            field_dict = {}
         else:
-            form_dict['data'] = initial_data
+            remote_field = get_serializer_instance(remote_field_class)
+            if self.collector.enabled:
+                with measure_field(self.context, name):
+                    field_dict = remote_field.serialize(field, name, form_initial_field_data, self.context)
+            else:
+                field_dict = remote_field.serialize(field, name, form_initial_field_data, self.context)
+
+        if name in self.readonly_fields:
+            field_dict['readonly'] = True
+
+        # Load the initial data, which is a conglomerate of form initial and field initial
+        if 'initial' not in field_dict:
+            field_dict['initial'] = None
+
+        return field_dict, remote_field_class
+
+    def build_schema(self):
+        """
+        Returns the static part of the form dictionary: the serialized fields
+        with their widgets and the choice table if enabled, along with the
+        remote field class used for every field so that initial values can be
+        computed per request.
+        """
+        self.context = self.new_context()
+        self.prefetch_choice_pages()
+
+        schema = {
+            'fields': OrderedDict(),
+            'serializers': {}
+        }
+
+        for name in self.fields:
+            schema['fields'][name], schema['serializers'][name] = self.serialize_field(name)
+
+        schema['choices'] = self.context['choice_table']
 
-        return resolve_promise(form_dict)
+        return schema
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+
+from django_remote_forms.backends import RemoteJSONEncoder
+from django_remote_forms.forms import RemoteForm
+from django_remote_forms.utils import resolve_value
+
+
+class RemoteFormSet(object):
+    """
+    Serializes a Django formset into a Python dictionary.
+
+    The fields of the formset's form class are serialized once, from the
+    formset's empty_form, and every form of the formset only carries its
+    prefix, errors and data, so the output grows with the number of forms
+    rather than with the number of forms times the size of the fields.
+
+    Keyword arguments are passed on to the RemoteForm of every form, e.g.
+    cache=True or exclude=['DELETE'].
+    """
+
+    def __init__(self, formset, **kwargs):
+        self.formset = formset
+        self.form_kwargs = kwargs
+
+    def as_dict(self):
+        """
+        Returns a formset as a dictionary that looks like the following:
+
+        formset = {
+            'title': 'text',
+            'prefix': 'text',
+            'is_bound': False,
+            'can_order': False,
+            'can_delete': False,
+            'management_form': {},
+            'non_form_errors': [],
+            'form': {
+                'title': 'text',
+                'label_suffix': ':',
+                'fields': {},
+                'fieldsets': [],
+                'ordered_fields': []
+            },
+            'forms': [{
+                'prefix': 'text',
+                'non_field_errors': [],
+                'errors': {},
+                'data': {}
+            }]
+        }
+
+        The fields of 'form' hold the initial values of new forms. Like with
+        RemoteForm, 'data' holds the initial values of unbound forms.
+        """
+        formset_dict = OrderedDict()
+
+        for key, value in self.iter_items():
+            if key == 'forms':
+                value = list(value)
+            formset_dict[key] = value
+
+        return formset_dict
+
+    def iter_json(self, encoder_class=RemoteJSONEncoder):
+        """
+        Yields the JSON representation of as_dict() in chunks, one chunk per
+        form, see RemoteForm.iter_json.
+        """
+        encoder = encoder_class()
+
+        yield '{'
+        for index, (key, value) in enumerate(self.iter_items()):
+            yield '%s%s: ' % (', ' if index else '', encoder.encode(key))
+
+            if key == 'forms':
+                yield '['
+                for form_index, form_dict in enumerate(value):
+                    yield '%s%s' % (', ' if form_index else '', encoder.encode(form_dict))
+                yield ']'
+            else:
+                yield encoder.encode(value)
+        yield '}'
+
+    def iter_items(self):
+        """
+        Yields the resolved (key, value) pairs of the formset dictionary in
+        order. The value for 'forms' is an iterator of form dictionaries.
+        """
+        remote_empty_form = RemoteForm(self.formset.empty_form, **self.form_kwargs)
+        schema = remote_empty_form.get_schema()
+
+        yield 'title', self.formset.__class__.__name__
+        yield 'prefix', self.formset.prefix
+        yield 'is_bound', self.formset.is_bound
+        yield 'can_order', self.formset.can_order
+        yield 'can_delete', self.formset.can_delete
+        yield 'management_form', self.get_management_form_dict()
+        yield 'non_form_errors', resolve_value(self.formset.non_form_errors())
+        yield 'form', self.get_form_schema(remote_empty_form, schema)
+        yield 'forms', self.iter_forms(remote_empty_form, schema)
+
+    def get_management_form_dict(self):
+        management_form = self.formset.management_form
+        remote_form = RemoteForm(management_form)
+        form_dict = remote_form.as_dict()
+
+        if management_form.is_bound:
+            # The data of the management form is that of the formset, pick the management values only
+            form_dict['data'] = dict(
+                (name, resolve_value(management_form[name].data)) for name in remote_form.fields
+            )
+
+        return form_dict
+
+    def get_form_schema(self, remote_form, schema):
+        form_schema = OrderedDict()
+        form_schema['title'] = remote_form.form.__class__.__name__
+        form_schema['label_suffix'] = resolve_value(remote_form.form.label_suffix)
+        form_schema['fields'] = schema['fields']
+
+        if schema['choices'] is not None:
+            form_schema['choices'] = schema['choices']
+
+        form_schema['fieldsets'] = resolve_value(getattr(remote_form.form, 'fieldsets', []))
+        form_schema['ordered_fields'] = remote_form.fields
+
+        return form_schema
+
+    def iter_forms(self, remote_empty_form, schema):
+        """
+        Yields the per form part of the dictionary of every form, computed
+        against the schema of the empty form.
+        """
+        form_kwargs = dict(self.form_kwargs, cache=False)
+
+        for form in self.formset.forms:
+            remote_form = RemoteForm(form, **form_kwargs)
+            remote_form.schema = schema
+
+            form_dict = OrderedDict()
+            form_dict['prefix'] = form.prefix
+            form_dict['non_field_errors'] = resolve_value(form.non_field_errors())
+            form_dict['errors'] = resolve_value(form.errors)
+
+            if form.is_bound:
+                # The data of bound forms is shared by the formset, pick the values of this form
+                form_dict['data'] = dict((name, resolve_value(form[name].data)) for name in remote_form.fields)
+            else:
+                form_dict['data'] = remote_form.get_initial_data()
+
+            yield form_dict
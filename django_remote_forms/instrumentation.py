@@ -0,0 +1,182 @@
+import threading
+import time
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.utils.importlib import import_module
+
+from django_remote_forms import logger
+
+
+class Collector(object):
+    """
+    Receives measurements of form serialization, keyed by form class name.
+    The base collector discards them, and serializers skip measuring
+    altogether while enabled is False.
+
+    Query counts are taken from django.db.connection.queries, which is
+    recorded while measuring. Queries of other database aliases aren't
+    counted. Fallbacks are fields and widgets of classes without a
+    serializer of their own, serialized by that of an ancestor class, or
+    not at all when none is registered.
+    """
+
+    enabled = False
+
+    def record_field(self, form_name, field_name, duration, queries):
+        pass
+
+    def record_widget(self, form_name, field_name, widget_name, duration):
+        pass
+
+    def record_fallback(self, form_name, field_name, class_name):
+        pass
+
+    def record_output(self, form_name, size):
+        pass
+
+
+class MemoryCollector(Collector):
+    """
+    Aggregates measurements in memory, see stats.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+
+    def get_form_stats(self, form_name):
+        if form_name not in self.stats:
+            self.stats[form_name] = {
+                'fields': {},
+                'widgets': {},
+                'fallbacks': {},
+                'output': {'count': 0, 'size': 0, 'max_size': 0},
+            }
+
+        return self.stats[form_name]
+
+    def add_timing(self, timings, key, duration, queries=0):
+        timing = timings.setdefault(key, {'count': 0, 'time': 0.0, 'max_time': 0.0, 'queries': 0})
+        timing['count'] += 1
+        timing['time'] += duration
+        timing['max_time'] = max(timing['max_time'], duration)
+        timing['queries'] += queries
+
+    def record_field(self, form_name, field_name, duration, queries):
+        with self._lock:
+            self.add_timing(self.get_form_stats(form_name)['fields'], field_name, duration, queries)
+
+    def record_widget(self, form_name, field_name, widget_name, duration):
+        with self._lock:
+            self.add_timing(self.get_form_stats(form_name)['widgets'], (field_name, widget_name), duration)
+
+    def record_fallback(self, form_name, field_name, class_name):
+        with self._lock:
+            fallbacks = self.get_form_stats(form_name)['fallbacks']
+            fallbacks[(field_name, class_name)] = fallbacks.get((field_name, class_name), 0) + 1
+
+    def record_output(self, form_name, size):
+        with self._lock:
+            output = self.get_form_stats(form_name)['output']
+            output['count'] += 1
+            output['size'] += size
+            output['max_size'] = max(output['max_size'], size)
+
+
+class LoggingCollector(Collector):
+    """
+    Logs every measurement to the django_remote_forms logger at debug level,
+    and fallbacks at warning level.
+    """
+
+    enabled = True
+
+    def record_field(self, form_name, field_name, duration, queries):
+        logger.debug('%s.%s serialized in %.3f ms with %d queries', form_name, field_name, duration * 1000, queries)
+
+    def record_widget(self, form_name, field_name, widget_name, duration):
+        logger.debug('%s.%s widget %s serialized in %.3f ms', form_name, field_name, widget_name, duration * 1000)
+
+    def record_fallback(self, form_name, field_name, class_name):
+        logger.warning('%s.%s has no serializer registered for %s', form_name, field_name, class_name)
+
+    def record_output(self, form_name, size):
+        logger.debug('%s encoded to %d bytes', form_name, size)
+
+
+_collector = None
+
+
+def get_collector():
+    """
+    Returns the collector used by RemoteForm by default, an instance of the
+    REMOTE_FORMS_COLLECTOR setting, e.g.
+    'django_remote_forms.instrumentation.MemoryCollector'. Measurements are
+    discarded when it isn't set.
+    """
+    global _collector
+
+    if _collector is None:
+        collector_path = getattr(settings, 'REMOTE_FORMS_COLLECTOR', None)
+        if collector_path is None:
+            _collector = Collector()
+        else:
+            module_name, class_name = collector_path.rsplit('.', 1)
+            _collector = getattr(import_module(module_name), class_name)()
+
+    return _collector
+
+
+def set_collector(collector):
+    global _collector
+    _collector = collector
+
+
+@contextmanager
+def measure_field(context, field_name):
+    """
+    Records the time and the number of queries taken by the serialization of
+    the named field with the collector of the context, which callers check
+    to be enabled beforehand.
+    """
+    collector = context['collector']
+
+    use_debug_cursor = connection.use_debug_cursor
+    connection.use_debug_cursor = True
+    query_count = len(connection.queries)
+    start = time.time()
+    try:
+        yield
+    finally:
+        duration = time.time() - start
+        queries = len(connection.queries) - query_count
+        connection.use_debug_cursor = use_debug_cursor
+
+        collector.record_field(context['form_name'], field_name, duration, queries)
+
+
+@contextmanager
+def measure_widget(context, field_name, widget):
+    collector = context['collector']
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        collector.record_widget(context['form_name'], field_name, widget.__class__.__name__, time.time() - start)
+
+
+def record_fallback(context, field_name, klass):
+    # Serializers may be used without a RemoteForm and its context
+    collector = context.get('collector')
+    if collector is not None and collector.enabled:
+        collector.record_fallback(context['form_name'], field_name, klass.__name__)
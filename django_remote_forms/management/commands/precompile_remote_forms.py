@@ -0,0 +1,61 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import CommandError, NoArgsCommand
+
+from django_remote_forms.precompile import (
+    create_pool, discover_form_entries, get_form_entries, get_languages, precompile_forms
+)
+
+
+class Command(NoArgsCommand):
+    help = (
+        'Serializes the forms listed in REMOTE_FORMS_PRECOMPILE, or found in the forms module of installed '
+        'apps, for every language in LANGUAGES into content addressed JSON and MessagePack files, which '
+        'django_remote_forms.views.precompiled_form_response serves.'
+    )
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--output', dest='output', default=None,
+                    help='Directory to write to, defaults to the REMOTE_FORMS_PRECOMPILE_DIR setting.'),
+        make_option('--discover', action='store_true', dest='discover', default=False,
+                    help='Precompile the forms found in the forms module of installed apps.'),
+        make_option('--languages', dest='languages', default=None,
+                    help='Comma separated language codes, defaults to the LANGUAGES setting.'),
+        make_option('--processes', dest='processes', type='int', default=None,
+                    help='Number of worker processes, defaults to the number of CPUs. 1 disables the pool.'),
+    )
+
+    def handle_noargs(self, **options):
+        directory = options['output'] or getattr(settings, 'REMOTE_FORMS_PRECOMPILE_DIR', None)
+        if not directory:
+            raise CommandError('Pass --output or set REMOTE_FORMS_PRECOMPILE_DIR')
+
+        if options['discover']:
+            entries = discover_form_entries()
+        else:
+            entries = get_form_entries()
+
+        if not entries:
+            raise CommandError('No forms to precompile, set REMOTE_FORMS_PRECOMPILE or pass --discover')
+
+        if options['languages']:
+            languages = options['languages'].split(',')
+        else:
+            languages = get_languages()
+
+        processes = options['processes']
+        if processes == 1:
+            manifest = precompile_forms(directory, entries, languages)
+        else:
+            pool = create_pool(processes)
+            try:
+                manifest = precompile_forms(directory, entries, languages, pool)
+            finally:
+                pool.close()
+                pool.join()
+
+        if int(options['verbosity']) > 0:
+            self.stdout.write('Precompiled %d forms in %d languages into %s\n' % (
+                len(manifest), len(languages), directory
+            ))
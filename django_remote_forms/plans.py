@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from operator import attrgetter
+
+from django_remote_forms.utils import resolve_value
+
+
+class Hook(object):
+    """
+    Marks a serialized key whose value is computed by a method of the
+    serializer. The method receives the serialized object, the dictionary
+    built so far, the field name, the initial value passed by the form
+    (None for widgets) and the serialization context, and must return a
+    resolved value.
+    """
+
+    def __init__(self, method_name):
+        self.method_name = method_name
+
+
+class Constant(object):
+    """
+    Marks a serialized key whose value is always the same.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+
+ATTRIBUTE, ATTRIBUTES, HOOK, CONSTANT = range(4)
+
+
+def compile_plan(serializer_class):
+    """
+    Flattens the ``attributes`` declared along the MRO of a serializer class
+    into a tuple of (kind, keys, getter) steps.
+
+    An attribute is declared either as the name of an attribute of the
+    serialized object, or as a (key, spec) pair where spec is an attribute
+    name (dotted names are supported), a Hook or a Constant. Keys redeclared
+    by a subclass keep the position of their first declaration, just like
+    updating a dictionary would. A class setting ``inherit_attributes`` to
+    False starts a new plan instead of extending the one of its parents.
+
+    Consecutive attributes are fetched with a single attrgetter call, and
+    hooks are stored as plain functions resolved for the concrete class.
+    """
+    def attribute_step(keys, names):
+        if len(keys) == 1:
+            return ATTRIBUTE, keys[0], attrgetter(names[0])
+
+        return ATTRIBUTES, tuple(keys), attrgetter(*names)
+
+    classes = []
+    for klass in serializer_class.__mro__:
+        if 'attributes' in klass.__dict__:
+            classes.append(klass)
+        if not klass.__dict__.get('inherit_attributes', True):
+            break
+
+    specs = OrderedDict()
+    for klass in reversed(classes):
+        for attribute in klass.__dict__['attributes']:
+            if isinstance(attribute, basestring):
+                key, spec = attribute, attribute
+            else:
+                key, spec = attribute
+            specs[key] = spec
+
+    plan = []
+    attribute_keys, attribute_names = [], []
+    for key, spec in specs.items():
+        if not isinstance(spec, (Hook, Constant)):
+            attribute_keys.append(key)
+            attribute_names.append(spec)
+            continue
+
+        if attribute_keys:
+            plan.append(attribute_step(attribute_keys, attribute_names))
+            attribute_keys, attribute_names = [], []
+
+        if isinstance(spec, Hook):
+            method = getattr(serializer_class, spec.method_name)
+            plan.append((HOOK, key, getattr(method, '__func__', method)))
+        else:
+            plan.append((CONSTANT, key, spec.value))
+
+    if attribute_keys:
+        plan.append(attribute_step(attribute_keys, attribute_names))
+
+    return tuple(plan)
+
+
+_plans = {}
+
+
+def get_plan(serializer_class):
+    try:
+        return _plans[serializer_class]
+    except KeyError:
+        plan = _plans[serializer_class] = compile_plan(serializer_class)
+        return plan
+
+
+def run_plan(serializer, obj, name, initial, context):
+    """
+    Serializes obj in a single pass over the compiled plan of the serializer.
+    name, initial and context are passed on to hooks.
+
+    Attribute values are resolved as they are extracted, see
+    utils.resolve_value. Hooks and constants return resolved values.
+
+    The result is a plain dictionary, as OrderedDict inserts written in
+    Python took half of the time of field serialization. The order of
+    fields is kept by the form dictionary.
+    """
+    try:
+        plan = _plans[serializer.__class__]
+    except KeyError:
+        plan = get_plan(serializer.__class__)
+
+    # Lazy values are resolved for the language of the whole serialization,
+    # see RemoteForm.new_context, rather than looking it up for every value
+    language = context.get('language')
+
+    result = {}
+    for kind, keys, getter in plan:
+        if kind == ATTRIBUTE:
+            result[keys] = resolve_value(getter(obj), language)
+        elif kind == ATTRIBUTES:
+            for key, value in zip(keys, getter(obj)):
+                result[key] = resolve_value(value, language)
+        elif kind == HOOK:
+            result[keys] = getter(serializer, obj, result, name, initial, context)
+        else:
+            result[keys] = getter
+
+    return result
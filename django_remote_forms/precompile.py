@@ -0,0 +1,222 @@
+import hashlib
+import inspect
+import json
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+
+from django import forms
+from django.conf import settings
+from django.db import connections
+from django.utils import translation
+from django.utils.importlib import import_module
+
+from django_remote_forms import logger
+from django_remote_forms.backends import JSONBackend, MessagePackBackend
+from django_remote_forms.forms import RemoteForm
+
+MANIFEST_NAME = 'manifest.json'
+
+# File extension of every backend precompiled forms are encoded with
+BACKENDS = (
+    ('json', JSONBackend),
+    ('msgpack', MessagePackBackend),
+)
+
+
+def import_form_class(path):
+    module_name, class_name = path.rsplit('.', 1)
+    return getattr(import_module(module_name), class_name)
+
+
+def get_form_entries():
+    """
+    Returns the forms to precompile listed in the REMOTE_FORMS_PRECOMPILE
+    setting as (name, form class path, RemoteForm options) tuples. Entries of
+    the setting are either form class paths or dictionaries:
+
+    REMOTE_FORMS_PRECOMPILE = [
+        'myapp.forms.LoginForm',
+        {'name': 'signup', 'form': 'myapp.forms.SignupForm', 'options': {'exclude': ['captcha']}},
+    ]
+    """
+    entries = []
+    for entry in getattr(settings, 'REMOTE_FORMS_PRECOMPILE', []):
+        if isinstance(entry, basestring):
+            entries.append((entry, entry, {}))
+        else:
+            entries.append((entry.get('name', entry['form']), entry['form'], entry.get('options', {})))
+
+    return entries
+
+
+def discover_form_entries():
+    """
+    Returns entries, see get_form_entries, for the forms defined in the
+    forms module of every installed app which can be built without
+    arguments.
+    """
+    entries = []
+    for app_name in settings.INSTALLED_APPS:
+        try:
+            module = import_module('%s.forms' % app_name)
+        except ImportError:
+            continue
+
+        for name, form_class in inspect.getmembers(module, inspect.isclass):
+            if not issubclass(form_class, forms.BaseForm) or form_class.__module__ != module.__name__:
+                continue
+
+            try:
+                form_class()
+            except Exception, e:
+                logger.info('Skipping form %s.%s which requires arguments: %s', module.__name__, name, e)
+                continue
+
+            path = '%s.%s' % (module.__name__, name)
+            entries.append((path, path, {}))
+
+    return entries
+
+
+def get_languages():
+    return [code for code, name in settings.LANGUAGES]
+
+
+def write_atomically(path, content):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as temp_file:
+        temp_file.write(content)
+    os.chmod(temp_path, 0644)
+    os.rename(temp_path, path)
+
+
+def write_content_addressed(directory, content, extension):
+    """
+    Writes content to a file named after its hash and returns the file name.
+    """
+    filename = '%s.%s' % (hashlib.sha1(content).hexdigest(), extension)
+    path = os.path.join(directory, filename)
+
+    if not os.path.exists(path):
+        write_atomically(path, content)
+
+    return filename
+
+
+def precompile_form(task):
+    """
+    Writes a form encoded by every backend, for one language, and returns its
+    manifest entry as (name, language, {extension: file name}).
+    """
+    directory, name, form_path, options, language = task
+
+    translation.activate(language)
+    try:
+        remote_form = RemoteForm(import_form_class(form_path)(), **options)
+        filenames = dict(
+            (extension, write_content_addressed(directory, remote_form.encode(backend_class()), extension))
+            for extension, backend_class in BACKENDS
+        )
+    finally:
+        translation.deactivate()
+
+    return name, language, filenames
+
+
+def create_pool(processes=None):
+    """
+    Returns a multiprocessing pool of processes workers. Database connections
+    are closed first, so that workers forked from this process open their own
+    rather than sharing those of this process.
+    """
+    for connection in connections.all():
+        connection.close()
+
+    return multiprocessing.Pool(processes)
+
+
+def precompile_forms(directory, entries, languages, pool=None):
+    """
+    Precompiles every entry, see get_form_entries, for every language into
+    directory, along with a manifest of the files written. The work is
+    spread over pool, a multiprocessing pool created with create_pool, when
+    given.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    tasks = [
+        (directory, name, form_path, options, language)
+        for name, form_path, options in entries
+        for language in languages
+    ]
+
+    if pool is None:
+        results = map(precompile_form, tasks)
+    else:
+        results = pool.map(precompile_form, tasks)
+
+    manifest = {}
+    for name, language, filenames in results:
+        manifest.setdefault(name, {})[language] = filenames
+
+    write_atomically(os.path.join(directory, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True))
+
+    return manifest
+
+
+_manifests = {}
+_mapped_files = {}
+_lock = threading.Lock()
+
+
+def get_precompiled_directory():
+    return settings.REMOTE_FORMS_PRECOMPILE_DIR
+
+
+def load_manifest(directory):
+    """
+    Returns the manifest of the forms precompiled into directory, read once
+    per process.
+    """
+    try:
+        return _manifests[directory]
+    except KeyError:
+        pass
+
+    with open(os.path.join(directory, MANIFEST_NAME)) as manifest_file:
+        manifest = _manifests[directory] = json.load(manifest_file)
+
+    return manifest
+
+
+def get_precompiled_filename(directory, name, language, extension):
+    """
+    Returns the file name of the named form precompiled for language, or for
+    its base language, e.g. 'pt' for 'pt-br', or None if there's none.
+    """
+    languages = load_manifest(directory).get(name, {})
+
+    filenames = languages.get(language) or languages.get(language.split('-')[0])
+    if filenames is None:
+        return None
+
+    return filenames.get(extension)
+
+
+def get_mapped_file(directory, filename):
+    """
+    Returns a read only memory map of a precompiled file, opened once per
+    process. Files are content addressed so they never change.
+    """
+    path = os.path.join(directory, filename)
+
+    with _lock:
+        if path not in _mapped_files:
+            with open(path, 'rb') as precompiled_file:
+                _mapped_files[path] = mmap.mmap(precompiled_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return _mapped_files[path]
@@ -0,0 +1,96 @@
+_serializer_instances = {}
+
+
+def get_serializer_instance(serializer_class):
+    try:
+        return _serializer_instances[serializer_class]
+    except KeyError:
+        serializer = _serializer_instances[serializer_class] = serializer_class()
+        return serializer
+
+
+class SerializerRegistry(object):
+    """
+    Maps Django field or widget classes to their Remote Forms serializer.
+
+    Lookups walk the MRO of the given class so that subclasses share the
+    serializer of their closest registered ancestor. The resolved serializer
+    is memoized per class, turning repeated lookups into a dictionary hit.
+
+    Third party apps can register serializers for their own classes:
+
+        from django_remote_forms.registry import field_serializers
+
+        field_serializers.register(MyField, RemoteMyField)
+    """
+
+    def __init__(self):
+        self._registry = {}
+        self._resolved = {}
+        self._instances = {}
+
+    def register(self, klass, serializer):
+        self._registry[klass] = serializer
+        self._resolved.clear()
+        self._instances.clear()
+
+    def unregister(self, klass):
+        self._registry.pop(klass, None)
+        self._resolved.clear()
+        self._instances.clear()
+
+    def register_by_name(self, serializers, *modules):
+        """
+        Registers every serializer named Remote<Name> for the class <Name>
+        found in the first of the given modules that defines it.
+        """
+        for serializer in serializers:
+            class_name = serializer.__name__[len('Remote'):]
+            for module in modules:
+                klass = getattr(module, class_name, None)
+                if klass is not None:
+                    self.register(klass, serializer)
+                    break
+
+    def is_registered(self, klass):
+        """
+        Returns whether a serializer is registered for klass itself, rather
+        than for one of its ancestors only.
+        """
+        return klass in self._registry
+
+    def get(self, klass):
+        try:
+            return self._resolved[klass]
+        except KeyError:
+            pass
+
+        serializer = None
+        for base in getattr(klass, '__mro__', (klass,)):
+            if base in self._registry:
+                serializer = self._registry[base]
+                break
+
+        self._resolved[klass] = serializer
+        return serializer
+
+    def get_serializer(self, klass):
+        """
+        Returns the shared instance of the serializer registered for klass,
+        or None. Serializers are stateless, so a single instance of every
+        serializer class serves all fields or widgets.
+        """
+        try:
+            return self._instances[klass]
+        except KeyError:
+            pass
+
+        serializer_class = self.get(klass)
+        serializer = get_serializer_instance(serializer_class) if serializer_class is not None else None
+
+        self._instances[klass] = serializer
+        return serializer
+
+
+field_serializers = SerializerRegistry()
+widget_serializers = SerializerRegistry()
@@ -1,5 +1,20 @@
+import hashlib
+import json
+
+from collections import OrderedDict
+
 from django.utils.functional import Promise
 from django.utils.encoding import force_unicode
+from django.utils.translation import get_language
+
+# Values of these types never need resolving
+PLAIN_TYPES = frozenset([type(None), bool, int, long, float, str, unicode])
+
+# Upper bound of memoized lazy strings per language, as lazy strings built
+# on the fly would otherwise be kept forever
+MAX_RESOLVED_PROMISES = 10000
+
+_resolved_promises = {}
 
 
 def resolve_promise(o):
@@ -21,3 +36,89 @@ def resolve_promise(o):
         o = o()
 
     return o
+
+
+def force_promise(promise, language=None):
+    """
+    Returns the text of a lazy object, memoized per active language so that
+    lazy labels and error messages shared by many fields are only forced once.
+    language is the active language, looked up when not given.
+    """
+    if language is None:
+        language = get_language()
+    resolved_promises = _resolved_promises.get(language)
+    if resolved_promises is None:
+        resolved_promises = _resolved_promises[language] = {}
+
+    try:
+        return resolved_promises[id(promise)][1]
+    except KeyError:
+        pass
+
+    try:
+        text = force_unicode(promise)
+    except:
+        # Item could be a lazy tuple or list
+        try:
+            text = [resolve_value(x, language) for x in promise]
+        except:
+            raise Exception('Unable to resolve lazy object %s' % promise)
+
+    if len(resolved_promises) >= MAX_RESOLVED_PROMISES:
+        resolved_promises.clear()
+
+    # The promise is kept alongside its text so that its id can't be reused
+    resolved_promises[id(promise)] = (promise, text)
+
+    return text
+
+
+def resolve_value(value, language=None):
+    """
+    Resolves a value as it is extracted for serialization: lazy objects are
+    forced, callables are called, and containers are copied when one of their
+    items needs resolving, as they may belong to a form field. language is
+    the active language, see force_promise.
+    """
+    if value.__class__ in PLAIN_TYPES:
+        return value
+
+    if isinstance(value, Promise):
+        return force_promise(value, language)
+
+    if isinstance(value, dict):
+        resolved = value
+        for k, v in value.items():
+            resolved_item = resolve_value(v, language)
+            if resolved_item is not v:
+                if resolved is value:
+                    resolved = OrderedDict(value) if isinstance(value, OrderedDict) else dict(value)
+                resolved[k] = resolved_item
+        return resolved
+
+    if isinstance(value, (list, tuple)):
+        resolved = [resolve_value(x, language) for x in value]
+        if any(x is not y for x, y in zip(resolved, value)):
+            return resolved
+        return value
+
+    if callable(value):
+        return value()
+
+    return value
+
+
+def get_callable_name(o):
+    return getattr(o, '__name__', o.__class__.__name__)
+
+
+def fingerprint(*values):
+    """
+    Returns a stable SHA-1 hex digest of resolved values, encoded like
+    RemoteForm.as_json does, so that e.g. the subfields of ComboFields are
+    hashed by their serialized definition.
+    """
+    # Imported here as the backends import the serializers, which import this module
+    from django_remote_forms.backends import RemoteJSONEncoder
+
+    return hashlib.sha1(json.dumps(values, cls=RemoteJSONEncoder, sort_keys=True)).hexdigest()
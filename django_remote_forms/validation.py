@@ -0,0 +1,247 @@
+import re
+
+import django
+
+from django import forms
+from django.core import validators
+
+from django_remote_forms import logger
+from django_remote_forms.choices import get_choice_page
+from django_remote_forms.utils import resolve_value
+
+# Letters of the JavaScript RegExp flags equivalent to Python's
+REGEX_FLAGS = (
+    (re.IGNORECASE, 'i'),
+    (re.MULTILINE, 'm'),
+    (re.DOTALL, 's'),
+)
+
+# Python only syntax and its JavaScript equivalent
+REGEX_SYNTAX = (
+    (re.compile(r'(?<!\\)((?:\\\\)*)\\A'), r'\1^'),
+    (re.compile(r'(?<!\\)((?:\\\\)*)\\Z'), r'\1$'),
+    (re.compile(r'\(\?P<'), '(?<'),
+    (re.compile(r'\(\?P=(\w+)\)'), r'\\k<\1>'),
+)
+
+INLINE_FLAGS = re.compile(r'^\(\?([iLmsux]+)\)')
+
+# Placeholders of numbers, e.g. %(show_value)d, kept for clients as %(show_value)s
+NUMBER_PLACEHOLDER = re.compile(r'%\((\w+)\)d')
+
+# Since Django 1.6 messages of decimal fields take a 'max' parameter, which
+# picks their plural form, rather than a positional one
+DECIMAL_MESSAGE_PARAMETER = 'max' if django.VERSION[:2] >= (1, 6) else None
+
+# Validators implemented by a function rather than a regular expression
+IP_ADDRESS_PROTOCOLS = {
+    validators.validate_ipv6_address: 'ipv6',
+    validators.validate_ipv46_address: 'both',
+}
+
+LIMIT_RULES = (
+    (validators.MinLengthValidator, 'min_length'),
+    (validators.MaxLengthValidator, 'max_length'),
+    (validators.MinValueValidator, 'min_value'),
+    (validators.MaxValueValidator, 'max_value'),
+)
+
+
+class Placeholders(dict):
+    """
+    Parameters of a message, which keeps the placeholders of missing ones.
+    """
+
+    def __missing__(self, key):
+        return '%%(%s)s' % key
+
+
+def format_message(message, **params):
+    """
+    Returns the resolved message with params substituted, keeping the other
+    placeholders as %(name)s, e.g. %(show_value)s, for clients to fill in.
+
+    Plural messages of Django 1.6 and later, e.g. those of length validators,
+    are lazy until formatted with the parameter picking their form, and only
+    pick it when some placeholders can't be formatted, e.g. %(show_value)d.
+    """
+    params = Placeholders(params)
+
+    try:
+        message = message % params
+    except (TypeError, ValueError):
+        pass
+
+    text = resolve_value(message)
+    if any('%%(%s)' % key in text for key in params):
+        text = NUMBER_PLACEHOLDER.sub(r'%(\1)s', text) % params
+
+    return text
+
+
+def format_decimal_message(message, value):
+    """
+    Returns a message of decimal fields formatted with value, like Django's
+    DecimalField does.
+    """
+    if DECIMAL_MESSAGE_PARAMETER is None:
+        return resolve_value(message) % value
+
+    return format_message(message, **{DECIMAL_MESSAGE_PARAMETER: value})
+
+
+def compile_pattern(regex):
+    """
+    Returns the pattern and the flags of a compiled regular expression for
+    the JavaScript RegExp constructor, translating \\A, \\Z and named groups.
+    """
+    pattern = regex.pattern
+    flags = regex.flags
+
+    # Flags set inline are already part of regex.flags
+    pattern = INLINE_FLAGS.sub('', pattern)
+
+    for syntax, replacement in REGEX_SYNTAX:
+        pattern = syntax.sub(replacement, pattern)
+
+    return pattern, ''.join(letter for flag, letter in REGEX_FLAGS if flags & flag)
+
+
+def compile_validator(validator):
+    """
+    Returns the rule checking the same as validator, or None for validators
+    which can only run on the server.
+    """
+    if isinstance(validator, validators.EmailValidator) and hasattr(validator, 'user_regex'):
+        return compile_email_validator(validator)
+
+    if isinstance(validator, validators.RegexValidator):
+        pattern, flags = compile_pattern(validator.regex)
+        return {
+            'type': 'regex',
+            'pattern': pattern,
+            'flags': flags,
+            'code': validator.code,
+            'message': resolve_value(validator.message),
+        }
+
+    for validator_class, rule_type in LIMIT_RULES:
+        if isinstance(validator, validator_class):
+            limit_value = resolve_value(validator.limit_value)
+            return {
+                'type': rule_type,
+                'limit_value': limit_value,
+                'code': validator.code,
+                'message': format_message(validator.message, limit_value=limit_value),
+            }
+
+    if validator in IP_ADDRESS_PROTOCOLS:
+        return {
+            'type': 'ip_address',
+            'protocol': IP_ADDRESS_PROTOCOLS[validator],
+            'code': 'invalid',
+            'message': None,
+        }
+
+    return None
+
+
+def compile_email_validator(validator):
+    """
+    Returns the rule of an EmailValidator of Django 1.6 and later, which
+    matches the parts of the address around its last @ separately rather
+    than with a single regular expression:
+
+    rule = {
+        'type': 'email',
+        'user_pattern': 'text', 'user_flags': 'i',
+        'domain_pattern': 'text', 'domain_flags': 'i',
+        'literal_pattern': 'text', 'literal_flags': 'i',
+        'domain_whitelist': ['localhost'],
+        'code': 'invalid',
+        'message': 'text'
+    }
+
+    The domain must be whitelisted, or match the domain or the literal
+    pattern, which is None before Django 1.7. Retrying with the IDNA encoded
+    domain is left to the server.
+    """
+    rule = {'type': 'email'}
+
+    for part in ('user', 'domain', 'literal'):
+        regex = getattr(validator, '%s_regex' % part, None)
+        if regex is None:
+            rule['%s_pattern' % part] = rule['%s_flags' % part] = None
+        else:
+            pattern, flags = compile_pattern(regex)
+            # EmailValidator matches from the start, which RegExp.test doesn't
+            rule['%s_pattern' % part], rule['%s_flags' % part] = '^(?:%s)' % pattern, flags
+
+    rule['domain_whitelist'] = list(
+        getattr(validator, 'domain_allowlist', None) or getattr(validator, 'domain_whitelist', [])
+    )
+    rule['code'] = validator.code
+    rule['message'] = resolve_value(validator.message)
+
+    return rule
+
+
+def compile_rules(field, name, context):
+    """
+    Returns the rules a client can check a value of field against before
+    submitting the form, as a list of dictionaries:
+
+    rules = [
+        {'type': 'max_length', 'limit_value': 30, 'code': 'max_length', 'message': 'text'},
+        {'type': 'regex', 'pattern': '^[-\\w]+$', 'flags': '', 'code': 'invalid', 'message': 'text'},
+    ]
+
+    Messages of limit rules are formatted with their limit, keeping the
+    %(show_value)s placeholder, and decimal rules carry a formatted message
+    per code. The error
+    messages of the field take precedence over those of its validators, as
+    they do on the server. Validators implemented in Python only, and model
+    choices which are paginated, are left to the server.
+    """
+    rules = []
+
+    for validator in field.validators:
+        rule = compile_validator(validator)
+        if rule is None:
+            logger.debug('Validator %r of field %s has no client side rule', validator, name)
+            continue
+        rules.append(rule)
+
+    if isinstance(field, forms.DecimalField) and (field.max_digits is not None or field.decimal_places is not None):
+        limits = {'max_digits': field.max_digits, 'max_decimal_places': field.decimal_places}
+        if field.max_digits is not None and field.decimal_places is not None:
+            limits['max_whole_digits'] = field.max_digits - field.decimal_places
+
+        rules.append({
+            'type': 'decimal',
+            'max_digits': field.max_digits,
+            'decimal_places': field.decimal_places,
+            'messages': dict(
+                (code, format_decimal_message(field.error_messages[code], limit))
+                for code, limit in limits.items() if limit is not None
+            ),
+        })
+
+    if isinstance(field, forms.ChoiceField) and not get_choice_page(field.choices, context, name).paginated:
+        # Values must be among the choices of the field
+        rules.append({
+            'type': 'choice',
+            'multiple': isinstance(field, (forms.MultipleChoiceField, forms.ModelMultipleChoiceField)),
+            'code': 'invalid_choice',
+            'message': resolve_value(field.error_messages['invalid_choice']),
+        })
+
+    # Like Field.run_validators, prefer the messages of the field by code
+    for rule in rules:
+        if 'code' in rule and rule['code'] in field.error_messages:
+            if 'limit_value' in rule:
+                rule['message'] = format_message(field.error_messages[rule['code']], limit_value=rule['limit_value'])
+            else:
+                rule['message'] = resolve_value(field.error_messages[rule['code']])
+
+    return rules
@@ -0,0 +1,164 @@
+import json
+
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from django.utils.translation import get_language
+
+from django_remote_forms.backends import JSONBackend, RemoteJSONEncoder
+from django_remote_forms.choices import paginate_choices
+from django_remote_forms.precompile import (
+    BACKENDS, get_mapped_file, get_precompiled_directory, get_precompiled_filename
+)
+
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Before Django 1.5, HttpResponse streams the iterators it's given
+    StreamingHttpResponse = HttpResponse
+
+DEFAULT_CHOICES_PAGE_SIZE = 50
+
+PRECOMPILED_CHUNK_SIZE = 64 * 1024
+
+
+def choices_response(request, form, field_name, page_size=DEFAULT_CHOICES_PAGE_SIZE, search_fields=None):
+    """
+    Serves a page of choices for a ModelChoiceField or ModelMultipleChoiceField
+    of form, continuing from the 'cursor' GET parameter and filtered by the
+    'search' GET parameter:
+
+    def country_choices(request):
+        return choices_response(request, AddressForm(), 'country', search_fields=['name'])
+
+    The response holds the choices of the page and the cursor of the next
+    page, which is null once all choices have been served.
+    """
+    field = form.fields[field_name]
+
+    try:
+        choice_page = paginate_choices(
+            field,
+            page_size,
+            cursor=request.GET.get('cursor'),
+            search=request.GET.get('search'),
+            search_fields=search_fields
+        )
+    except ValueError, e:
+        return HttpResponseBadRequest(str(e))
+
+    response_data = {
+        'choices': [{'value': key, 'display': value} for key, value in choice_page.choices],
+        'cursor': choice_page.cursor
+    }
+
+    return HttpResponse(
+        json.dumps(response_data, cls=RemoteJSONEncoder),
+        content_type='application/json'
+    )
+
+
+def field_validation_response(request, remote_form, clean_form=False):
+    """
+    Validates the fields named by the 'field' GET parameters only, see
+    RemoteForm.validate_fields, and returns their errors:
+
+    def validate_signup(request):
+        return field_validation_response(request, RemoteForm(SignupForm(request.POST)))
+
+    e.g. for POST /signup/validate?field=email. The response is the errors
+    only, without serializing the form.
+    """
+    field_names = request.GET.getlist('field')
+    if not field_names:
+        return HttpResponseBadRequest('No field to validate')
+
+    try:
+        form_dict = remote_form.validate_fields(field_names, clean_form=clean_form)
+    except ValueError, e:
+        return HttpResponseBadRequest(str(e))
+
+    return HttpResponse(json.dumps(form_dict, cls=RemoteJSONEncoder), content_type='application/json')
+
+
+def remote_form_response(request, remote_form, backend=None):
+    """
+    Returns the representation of remote_form encoded by backend, JSON by
+    default, see django_remote_forms.backends, with an ETag, or an empty
+    304 Not Modified response when the request's If-None-Match header holds
+    that ETag already, in which case the form isn't serialized at all:
+
+    def my_form(request):
+        return remote_form_response(request, RemoteForm(MyForm(), cache=True))
+
+    The ETag is derived from the cached schema fingerprint and the per request
+    parts of the output, so enable the cache for it to be cheap.
+    """
+    if backend is None:
+        backend = JSONBackend()
+
+    etag = '%s-%s' % (remote_form.get_etag(), backend.name)
+
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    response = HttpResponse(remote_form.encode(backend), content_type=backend.content_type)
+    response['ETag'] = quote_etag(etag)
+    return response
+
+
+def precompiled_form_response(request, name, extension='json', directory=None):
+    """
+    Serves the named form, as precompiled by the precompile_remote_forms
+    management command for the active language, from a memory mapped file
+    without serializing it:
+
+    def login_form(request):
+        return precompiled_form_response(request, 'myapp.forms.LoginForm')
+
+    extension is 'json' or 'msgpack' and directory defaults to the
+    REMOTE_FORMS_PRECOMPILE_DIR setting.
+    """
+    if directory is None:
+        directory = get_precompiled_directory()
+
+    try:
+        filename = get_precompiled_filename(directory, name, get_language(), extension)
+    except IOError:
+        raise Http404('No precompiled forms in %s' % directory)
+
+    if filename is None:
+        raise Http404('No precompiled form %s' % name)
+
+    # Files are named after the hash of their content
+    etag = filename.split('.')[0]
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    mapped_file = get_mapped_file(directory, filename)
+
+    response = StreamingHttpResponse(
+        iter_mapped_file(mapped_file), content_type=dict(BACKENDS)[extension].content_type
+    )
+    response['Content-Length'] = str(len(mapped_file))
+    response['ETag'] = quote_etag(etag)
+    return response
+
+
+def iter_mapped_file(mapped_file):
+    for offset in xrange(0, len(mapped_file), PRECOMPILED_CHUNK_SIZE):
+        yield mapped_file[offset:offset + PRECOMPILED_CHUNK_SIZE]
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def not_modified_response(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = quote_etag(etag)
+    return response
@@ -1,272 +1,328 @@
 import datetime
 
+from django.forms import widgets
 from django.utils.dates import MONTHS
-from collections import OrderedDict
+from django.utils.encoding import force_unicode
+from django.utils.translation import get_language
+
+from django_remote_forms import logger
+from django_remote_forms.choices import get_choice_page, serialize_choice_page
+from django_remote_forms.instrumentation import record_fallback
+from django_remote_forms.plans import Constant, Hook, run_plan
+from django_remote_forms.registry import widget_serializers
+
+# Key of the date picker choices in the choice table, which can't clash with a field name
+DATE_CHOICES_KEY = 'date-picker'
+
+_date_choices = {}
+
+
+def get_date_choices():
+    """
+    Returns the day, month and year choices of date pickers. They are built
+    once per year and active language and shared by every RemoteDateInput,
+    so they must not be modified.
+    """
+    current_year = datetime.date.today().year
+    cache_key = (current_year, get_language())
+
+    try:
+        return _date_choices[cache_key]
+    except KeyError:
+        pass
+
+    date_choices = _date_choices[cache_key] = [{
+        'title': 'day',
+        'data': [{'key': x, 'value': x} for x in range(1, 32)]
+    }, {
+        'title': 'month',
+        'data': [{'key': x, 'value': force_unicode(y)} for (x, y) in MONTHS.items()]
+    }, {
+        'title': 'year',
+        'data': [{'key': x, 'value': x} for x in range(current_year - 100, current_year + 1)]
+    }]
+
+    return date_choices
 
 
 class RemoteWidget(object):
-    def __init__(self, widget, field_name=None):
+    """
+    A base object for being able to return a Django Widget as a Python
+    dictionary.
+
+    The keys of the dictionary are declared in ``attributes`` and extended by
+    subclasses. They are compiled once per class into a flat plan, see
+    django_remote_forms.plans.
+
+    Like field serializers, widget serializers are stateless and a single
+    instance per class serializes every widget with
+    serialize(widget, name, context).
+    """
+
+    __slots__ = ('widget', 'field_name', 'context')
+
+    attributes = (
+        ('title', '__class__.__name__'),
+        'is_hidden',
+        'needs_multipart_form',
+        'is_localized',
+        'is_required',
+        'attrs',
+    )
+
+    def __init__(self, widget=None, field_name=None, context=None):
         self.field_name = field_name
         self.widget = widget
+        self.context = context
 
-    def as_dict(self):
-        widget_dict = OrderedDict()
-        widget_dict['title'] = self.widget.__class__.__name__
-        widget_dict['is_hidden'] = self.widget.is_hidden
-        widget_dict['needs_multipart_form'] = self.widget.needs_multipart_form
-        widget_dict['is_localized'] = self.widget.is_localized
-        widget_dict['is_required'] = self.widget.is_required
-        widget_dict['attrs'] = self.widget.attrs
+    def serialize(self, widget, name, context):
+        return run_plan(self, widget, name, None, context)
 
-        return widget_dict
+    def as_dict(self):
+        context = self.context if self.context is not None else {}
+        return self.serialize(self.widget, self.field_name, context)
 
 
 class RemoteInput(RemoteWidget):
-    def as_dict(self):
-        widget_dict = super(RemoteInput, self).as_dict()
+    __slots__ = ()
 
-        widget_dict['input_type'] = self.widget.input_type
-
-        return widget_dict
+    attributes = ('input_type',)
 
 
 class RemoteTextInput(RemoteInput):
-    def as_dict(self):
-        return super(RemoteTextInput, self).as_dict()
+    __slots__ = ()
 
 
 class RemotePasswordInput(RemoteInput):
-    def as_dict(self):
-        return super(RemotePasswordInput, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteHiddenInput(RemoteInput):
-    def as_dict(self):
-        return super(RemoteHiddenInput, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteEmailInput(RemoteInput):
-    def as_dict(self):
-        widget_dict = super(RemoteEmailInput, self).as_dict()
+    __slots__ = ()
 
-        widget_dict['title'] = 'TextInput'
-        widget_dict['input_type'] = 'text'
-
-        return widget_dict
+    attributes = (
+        ('title', Constant('TextInput')),
+        ('input_type', Constant('text')),
+    )
 
 
 class RemoteNumberInput(RemoteInput):
-    def as_dict(self):
-        widget_dict = super(RemoteNumberInput, self).as_dict()
+    __slots__ = ()
 
-        widget_dict['title'] = 'TextInput'
-        widget_dict['input_type'] = 'text'
-
-        return widget_dict
+    attributes = (
+        ('title', Constant('TextInput')),
+        ('input_type', Constant('text')),
+    )
 
 
 class RemoteURLInput(RemoteInput):
-    def as_dict(self):
-        widget_dict = super(RemoteURLInput, self).as_dict()
-
-        widget_dict['title'] = 'TextInput'
-        widget_dict['input_type'] = 'text'
+    __slots__ = ()
 
-        return widget_dict
+    attributes = (
+        ('title', Constant('TextInput')),
+        ('input_type', Constant('text')),
+    )
 
 
 class RemoteMultipleHiddenInput(RemoteHiddenInput):
-    def as_dict(self):
-        widget_dict = super(RemoteMultipleHiddenInput, self).as_dict()
-
-        widget_dict['choices'] = self.widget.choices
+    __slots__ = ()
 
-        return widget_dict
+    attributes = ('choices',)
 
 
 class RemoteFileInput(RemoteInput):
-    def as_dict(self):
-        return super(RemoteFileInput, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteClearableFileInput(RemoteFileInput):
-    def as_dict(self):
-        widget_dict = super(RemoteClearableFileInput, self).as_dict()
-
-        widget_dict['initial_text'] = self.widget.initial_text
-        widget_dict['input_text'] = self.widget.input_text
-        widget_dict['clear_checkbox_label'] = self.widget.clear_checkbox_label
+    __slots__ = ()
 
-        return widget_dict
+    attributes = ('initial_text', 'input_text', 'clear_checkbox_label')
 
 
 class RemoteTextarea(RemoteWidget):
-    def as_dict(self):
-        widget_dict = super(RemoteTextarea, self).as_dict()
-        widget_dict['input_type'] = 'textarea'
-        return widget_dict
+    __slots__ = ()
 
+    attributes = (
+        ('input_type', Constant('textarea')),
+    )
 
-class RemoteTimeInput(RemoteInput):
-    def as_dict(self):
-        widget_dict = super(RemoteTimeInput, self).as_dict()
 
-        widget_dict['format'] = self.widget.format
-        widget_dict['input_type'] = 'time'
+class RemoteTimeInput(RemoteInput):
+    __slots__ = ()
 
-        return widget_dict
+    attributes = (
+        'format',
+        ('input_type', Constant('time')),
+    )
 
 
 class RemoteDateInput(RemoteTimeInput):
-    def as_dict(self):
-        widget_dict = super(RemoteDateInput, self).as_dict()
+    __slots__ = ()
 
-        widget_dict['input_type'] = 'date'
+    attributes = (
+        ('input_type', Constant('date')),
+        ('choices', Hook('serialize_choices')),
+    )
 
-        current_year = datetime.datetime.now().year
-        widget_dict['choices'] = [{
-            'title': 'day',
-            'data': [{'key': x, 'value': x} for x in range(1, 32)]
-        }, {
-            'title': 'month',
-            'data': [{'key': x, 'value': y} for (x, y) in MONTHS.items()]
-        }, {
-            'title': 'year',
-            'data': [{'key': x, 'value': x} for x in range(current_year - 100, current_year + 1)]
-        }]
+    def serialize_choices(self, widget, widget_dict, name, initial, context):
+        date_choices = get_date_choices()
 
-        return widget_dict
+        # Send the date choices once per form when using a choice table
+        choice_table = context.get('choice_table')
+        if choice_table is None:
+            return date_choices
 
+        choice_table.setdefault(DATE_CHOICES_KEY, date_choices)
+        return DATE_CHOICES_KEY
 
-class RemoteDateTimeInput(RemoteTimeInput):
-    def as_dict(self):
-        widget_dict = super(RemoteDateTimeInput, self).as_dict()
 
-        widget_dict['input_type'] = 'datetime'
+class RemoteDateTimeInput(RemoteTimeInput):
+    __slots__ = ()
 
-        return widget_dict
+    attributes = (
+        ('input_type', Constant('datetime')),
+    )
 
 
 class RemoteCheckboxInput(RemoteWidget):
-    def as_dict(self):
-        widget_dict = super(RemoteCheckboxInput, self).as_dict()
+    __slots__ = ()
 
-        # If check test is None then the input should accept null values
-        check_test = None
-        if self.widget.check_test is not None:
-            check_test = True
+    attributes = (
+        ('check_test', Hook('serialize_check_test')),
+        ('input_type', Constant('checkbox')),
+    )
 
-        widget_dict['check_test'] = check_test
-        widget_dict['input_type'] = 'checkbox'
+    def serialize_check_test(self, widget, widget_dict, name, initial, context):
+        # If check test is None then the input should accept null values
+        if widget.check_test is not None:
+            return True
 
-        return widget_dict
+        return None
 
 
 class RemoteSelect(RemoteWidget):
-    def as_dict(self):
-        widget_dict = super(RemoteSelect, self).as_dict()
-
-        widget_dict['choices'] = []
-        for key, value in self.widget.choices:
-            widget_dict['choices'].append({
-                'value': key,
-                'display': value
-            })
+    __slots__ = ()
 
-        widget_dict['input_type'] = 'select'
+    attributes = (
+        ('choices', Hook('serialize_choices')),
+        ('input_type', Constant('select')),
+    )
 
-        return widget_dict
+    def serialize_choices(self, widget, widget_dict, name, initial, context):
+        choice_page = get_choice_page(widget.choices, context, name)
+        return serialize_choice_page(choice_page, context, name)
 
 
 class RemoteNullBooleanSelect(RemoteSelect):
-    def as_dict(self):
-        return super(RemoteNullBooleanSelect, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteSelectMultiple(RemoteSelect):
-    def as_dict(self):
-        widget_dict = super(RemoteSelectMultiple, self).as_dict()
+    __slots__ = ()
 
-        widget_dict['input_type'] = 'selectmultiple'
-        widget_dict['size'] = len(widget_dict['choices'])
+    attributes = (
+        ('input_type', Constant('selectmultiple')),
+        ('size', Hook('serialize_size')),
+    )
 
-        return widget_dict
+    def serialize_size(self, widget, widget_dict, name, initial, context):
+        return len(get_choice_page(widget.choices, context, name).choices)
 
 
 class RemoteRadioInput(RemoteWidget):
-    def as_dict(self):
-        widget_dict = OrderedDict()
-        widget_dict['title'] = self.widget.__class__.__name__
-        widget_dict['name'] = self.widget.name
-        widget_dict['value'] = self.widget.value
-        widget_dict['attrs'] = self.widget.attrs
-        widget_dict['choice_value'] = self.widget.choice_value
-        widget_dict['choice_label'] = self.widget.choice_label
-        widget_dict['index'] = self.widget.index
-        widget_dict['input_type'] = 'radio'
+    __slots__ = ()
 
-        return widget_dict
+    inherit_attributes = False
+    attributes = (
+        ('title', '__class__.__name__'),
+        'name',
+        'value',
+        'attrs',
+        'choice_value',
+        'choice_label',
+        'index',
+        ('input_type', Constant('radio')),
+    )
 
 
 class RemoteRadioFieldRenderer(RemoteWidget):
-    def as_dict(self):
-        widget_dict = OrderedDict()
-        widget_dict['title'] = self.widget.__class__.__name__
-        widget_dict['name'] = self.widget.name
-        widget_dict['value'] = self.widget.value
-        widget_dict['attrs'] = self.widget.attrs
-        widget_dict['choices'] = self.widget.choices
-        widget_dict['input_type'] = 'radio'
+    __slots__ = ()
 
-        return widget_dict
+    inherit_attributes = False
+    attributes = (
+        ('title', '__class__.__name__'),
+        'name',
+        'value',
+        'attrs',
+        'choices',
+        ('input_type', Constant('radio')),
+    )
 
 
 class RemoteRadioSelect(RemoteSelect):
-    def as_dict(self):
-        widget_dict = super(RemoteRadioSelect, self).as_dict()
+    __slots__ = ()
 
-        widget_dict['choices'] = []
-        for key, value in self.widget.choices:
-            widget_dict['choices'].append({
-                'name': self.field_name or '',
-                'value': key,
-                'display': value
-            })
+    attributes = (
+        ('input_type', Constant('radio')),
+    )
 
-        widget_dict['input_type'] = 'radio'
+    def serialize_choices(self, widget, widget_dict, name, initial, context):
+        choice_page = get_choice_page(widget.choices, context, name)
 
-        return widget_dict
+        # Entries of the choice table are shared with the field and carry no name
+        if context.get('choice_table') is not None:
+            return serialize_choice_page(choice_page, context, name)
+
+        choice_name = name or ''
+        return [{'name': choice_name, 'value': key, 'display': value} for key, value in choice_page.choices]
 
 
 class RemoteCheckboxSelectMultiple(RemoteSelectMultiple):
-    def as_dict(self):
-        return super(RemoteCheckboxSelectMultiple, self).as_dict()
+    __slots__ = ()
 
 
 class RemoteMultiWidget(RemoteWidget):
-    def as_dict(self):
-        widget_dict = super(RemoteMultiWidget, self).as_dict()
+    __slots__ = ()
 
+    attributes = (
+        ('widgets', Hook('serialize_widgets')),
+    )
+
+    def serialize_widgets(self, widget, widget_dict, name, initial, context):
         widget_list = []
-        for widget in self.widget.widgets:
+        for index, sub_widget in enumerate(widget.widgets):
             # Fetch remote widget and convert to dict
-            widget_list.append()
+            remote_widget = widget_serializers.get_serializer(sub_widget.__class__)
+            if remote_widget is None or not widget_serializers.is_registered(sub_widget.__class__):
+                record_fallback(context, name, sub_widget.__class__)
 
-        widget_dict['widgets'] = widget_list
+            if remote_widget is None:
+                logger.warning('No serializer registered for widget %s', sub_widget.__class__.__name__)
+                widget_list.append({})
+            else:
+                # Sub-widgets are named like MultiWidget.render names them, so
+                # that each has its own memoized choices and choice table entry
+                widget_list.append(remote_widget.serialize(sub_widget, '%s_%d' % (name, index), context))
 
-        return widget_dict
+        return widget_list
 
 
 class RemoteSplitDateTimeWidget(RemoteMultiWidget):
-    def as_dict(self):
-        widget_dict = super(RemoteSplitDateTimeWidget, self).as_dict()
-
-        widget_dict['date_format'] = self.widget.date_format
-        widget_dict['time_format'] = self.widget.time_format
+    __slots__ = ()
 
-        return widget_dict
+    attributes = ('date_format', 'time_format')
 
 
 class RemoteSplitHiddenDateTimeWidget(RemoteSplitDateTimeWidget):
-    def as_dict(self):
-        return super(RemoteSplitHiddenDateTimeWidget, self).as_dict()
+    __slots__ = ()
+
+
+widget_serializers.register_by_name(
+    [x for x in globals().values() if isinstance(x, type) and issubclass(x, RemoteWidget)],
+    widgets
+)